@@ -0,0 +1,719 @@
+import csv
+import itertools
+import math
+import multiprocessing
+import os
+import platform
+import queue
+import statistics
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+from pathlib import Path
+import cv2
+import mediapipe as mp
+import numpy as np
+
+class LatestFrameCapture:
+    """Reads camera frames on a background thread and keeps only the newest one.
+    
+    The camera is drained as fast as it delivers, so a slow processing loop always
+    gets the most recent frame instead of one that waited in the driver's buffer.
+    Frames that were replaced before anybody read them are counted as dropped.
+    """
+    
+    def __init__(self, source=0):
+        self.cap = cv2.VideoCapture(source)
+        # Ask the driver for a minimal buffer (not every backend supports it)
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        
+        self.new_frame = threading.Condition()
+        self.frame = None
+        self.timestamp = None
+        self.frame_id = 0
+        self.read_id = 0
+        self.captured_frames = 0
+        self.dropped_frames = 0
+        self.failed = False
+        self.running = True
+        
+        self.thread = threading.Thread(target=self.update, name='camera-capture', daemon=True)
+        self.thread.start()
+    
+    def update(self):
+        """Capture loop: replace the stored frame with every new one"""
+        while self.running:
+            ret, frame = self.cap.read()
+            # Timestamp as soon as the driver hands the frame over
+            timestamp = time.perf_counter()
+            with self.new_frame:
+                if not ret:
+                    self.failed = True
+                    self.new_frame.notify_all()
+                    return
+                if self.frame_id != self.read_id:
+                    self.dropped_frames += 1
+                self.frame = frame
+                self.timestamp = timestamp
+                self.frame_id += 1
+                self.captured_frames += 1
+                self.new_frame.notify_all()
+    
+    def is_opened(self):
+        """True while the camera is open and delivering frames"""
+        return self.cap.isOpened() and not self.failed
+    
+    def read(self, timeout=5.0):
+        """Wait for a frame newer than the last one read; returns (ret, frame, capture timestamp)"""
+        with self.new_frame:
+            self.new_frame.wait_for(lambda: self.frame_id != self.read_id or self.failed, timeout)
+            if self.frame_id == self.read_id:
+                return False, None, None
+            self.read_id = self.frame_id
+            return True, self.frame, self.timestamp
+    
+    def release(self):
+        """Stop the capture thread and release the camera"""
+        self.running = False
+        self.thread.join(timeout=1.0)
+        self.cap.release()
+
+class StageTimer:
+    """Per-stage timings of the frame loop, with percentiles, a live overlay and a CSV dump.
+    
+    Each stage adds its time.perf_counter() durations to the current frame, and
+    end_frame() closes the frame. A frame's total is the time since the previous frame
+    ended, so it includes waiting for the camera; time not spent in any stage is
+    reported as 'other'. Percentiles on screen cover the last `window` frames, the
+    summary and the CSV dump cover every frame.
+    """
+    
+    STAGES = ('capture', 'convert', 'inference', 'landmarks', 'overlay', 'display')
+    COLUMNS = ('total', 'other') + STAGES
+    
+    def __init__(self, window=300):
+        self.current = dict.fromkeys(self.STAGES, 0.0)
+        self.recent = deque(maxlen=window)  # seconds per column, per recent frame
+        self.rows = []                      # (timestamp, seconds per column) of every frame
+        self.frame_start = None
+    
+    def start(self):
+        """Start timing the first frame"""
+        self.current = dict.fromkeys(self.STAGES, 0.0)
+        self.frame_start = time.perf_counter()
+    
+    def add(self, stage, seconds):
+        """Add time spent in a stage to the current frame"""
+        self.current[stage] += seconds
+    
+    def end_frame(self, timestamp=None):
+        """Close the current frame and start the next one"""
+        now = time.perf_counter()
+        if self.frame_start is not None:
+            total = now - self.frame_start
+            stages = [self.current[stage] for stage in self.STAGES]
+            row = (total, max(0.0, total - sum(stages)), *stages)
+            self.recent.append(row)
+            self.rows.append((timestamp, row))
+        self.current = dict.fromkeys(self.STAGES, 0.0)
+        self.frame_start = now
+    
+    def busy_time(self):
+        """Seconds the last frame spent on anything but waiting for the camera"""
+        total, _, capture = self.recent[-1][:3]
+        return total - capture
+    
+    def summary(self, skip=0):
+        """Frame rate and mean/p50/p95/p99 in ms of every stage over all frames but the first skip"""
+        times = 1000 * np.array([row for _, row in self.rows[skip:]])
+        if not len(times):
+            return {"frames": 0}
+        
+        mean = times.mean(axis=0)
+        p50, p95, p99 = np.percentile(times, [50, 95, 99], axis=0)
+        stats = {"frames": len(times), "fps": 1000 / mean[0] if mean[0] > 0 else 0.0}
+        for i, column in enumerate(self.COLUMNS):
+            stats[column] = {"mean_ms": float(mean[i]), "p50_ms": float(p50[i]),
+                             "p95_ms": float(p95[i]), "p99_ms": float(p99[i])}
+        return stats
+    
+    def print_summary(self, skip=0):
+        """Print the frame rate and the percentiles of every stage"""
+        stats = self.summary(skip)
+        if not stats["frames"]:
+            return
+        print(f"{stats['frames']} frames at {stats['fps']:.1f} frames/sec")
+        print(f"{'Stage':<12}{'mean ms':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+        for column in self.COLUMNS:
+            s = stats[column]
+            print(f"{column:<12}{s['mean_ms']:>9.2f}{s['p50_ms']:>9.2f}{s['p95_ms']:>9.2f}{s['p99_ms']:>9.2f}")
+    
+    def draw(self, frame):
+        """Overlay the frame rate and the p50/p95 time of every stage over the recent frames"""
+        if not self.recent:
+            return
+        h, w, _ = frame.shape
+        
+        times = 1000 * np.array(self.recent)
+        p50, p95 = np.percentile(times, [50, 95], axis=0)
+        fps = 1000 / times[:, 0].mean() if times[:, 0].mean() > 0 else 0.0
+        
+        # Black box in the lower left, above the bottom line of text
+        top = h - 70 - 22 * (len(self.COLUMNS) + 1)
+        cv2.rectangle(frame, (10, top), (290, h - 50), (0, 0, 0), -1)
+        cv2.putText(frame, f"FPS {fps:.1f}", (20, top + 22), cv2.FONT_HERSHEY_SIMPLEX, 0.55, (0, 255, 255), 1)
+        cv2.putText(frame, "p50   p95 ms", (160, top + 22), cv2.FONT_HERSHEY_SIMPLEX, 0.55, (0, 255, 255), 1)
+        for i, column in enumerate(self.COLUMNS):
+            y = top + 44 + 22 * i
+            cv2.putText(frame, column, (20, y), cv2.FONT_HERSHEY_SIMPLEX, 0.55, (255, 255, 255), 1)
+            cv2.putText(frame, f"{p50[i]:5.1f} {p95[i]:5.1f}", (160, y), cv2.FONT_HERSHEY_SIMPLEX, 0.55, (255, 255, 255), 1)
+    
+    def write_csv(self, path):
+        """Write the timings of every frame in ms, one row per frame"""
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(["frame", "timestamp"] + [f"{column}_ms" for column in self.COLUMNS])
+            for i, (timestamp, row) in enumerate(self.rows):
+                writer.writerow([i, "" if timestamp is None else f"{timestamp:.6f}"] + [f"{1000 * value:.3f}" for value in row])
+        print(f"Stage timings of {len(self.rows)} frames written to {path}")
+
+class SharedFrameRing:
+    """A ring of frame slots in shared memory, written by the tracking worker and read by the viewer.
+    
+    Frames are copied into the next of `slots` slots of one multiprocessing.shared_memory
+    block and only their sequence numbers travel between the processes, so frames are
+    never pickled. Each slot keeps the sequence number of its frame next to the pixels,
+    set to -1 while the slot is being written. The reader copies a slot out and checks
+    that number before and after the copy, so a frame the writer overwrote in the
+    meantime is dropped instead of shown torn.
+    """
+    
+    def __init__(self, shape, slots=4, name=None):
+        self.shape = tuple(shape)
+        self.slots = slots
+        frame_bytes = int(np.prod(self.shape))
+        self.shm = shared_memory.SharedMemory(name=name, create=name is None, size=slots * (8 + frame_bytes))
+        self.name = self.shm.name
+        self.sequences = np.ndarray((slots,), dtype=np.int64, buffer=self.shm.buf)
+        self.frames = np.ndarray((slots, *self.shape), dtype=np.uint8, buffer=self.shm.buf, offset=8 * slots)
+        if name is None:
+            self.sequences[:] = -1
+        self.next_sequence = 0
+    
+    def write(self, frame):
+        """Copy a frame into the next slot; returns its sequence number"""
+        sequence = self.next_sequence
+        slot = sequence % self.slots
+        self.sequences[slot] = -1  # Slot is being written
+        np.copyto(self.frames[slot], frame)
+        self.sequences[slot] = sequence
+        self.next_sequence += 1
+        return sequence
+    
+    def read(self, sequence, out=None):
+        """Copy a frame out of shared memory (into out, when given), or None if its slot was reused"""
+        slot = sequence % self.slots
+        if self.sequences[slot] != sequence:
+            return None
+        out = np.empty(self.shape, dtype=np.uint8) if out is None else out
+        np.copyto(out, self.frames[slot])
+        # The writer marks the slot before overwriting it; a changed number means the copy may be torn
+        if self.sequences[slot] != sequence:
+            return None
+        return out
+    
+    def close(self, unlink=False):
+        """Release the shared memory"""
+        del self.sequences, self.frames
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+class AdaptiveInference:
+    """Runs a MediaPipe solution on a downscaled frame, or on a crop around the previous landmarks.
+    
+    Landmarks are mapped back to normalized coordinates of the full frame, so the
+    results look exactly like those of full-frame inference. The crop only moves when
+    the landmarks get close to its edge, which keeps MediaPipe's own frame-to-frame
+    tracking stable, and the full frame is checked again every refresh_frames frames.
+    A crop is only used once min_lists landmark lists are found (e.g. both hands), so a
+    second one is never missed for a whole refresh interval because it lies outside it.
+    """
+    
+    def __init__(self, solution, landmark_lists, max_side=640, use_roi=True, margin=0.4,
+                 min_roi_side=0.3, refresh_frames=30, stages=None, min_lists=1):
+        self.solution = solution              # MediaPipe solution object with a process(rgb) method
+        self.landmark_lists = landmark_lists  # results -> list of landmark lists found
+        self.max_side = max_side              # longest side of the image passed to MediaPipe (0 = full size)
+        self.use_roi = use_roi
+        self.margin = margin                  # crop padding, relative to the landmarks' larger extent
+        self.min_roi_side = min_roi_side      # smallest crop side, relative to the frame
+        self.refresh_frames = refresh_frames
+        self.stages = stages                  # StageTimer that receives the convert and inference times
+        self.min_lists = min_lists            # landmark lists to find before detection moves to a crop
+        
+        self.roi = None        # (x0, y0, x1, y1) in normalized full-frame coordinates
+        self.roi_count = 0     # landmark lists found when the crop was placed
+        self.roi_age = 0
+        self.roi_frames = 0
+        self.full_frames = 0
+    
+    def process(self, frame):
+        """Detect landmarks in a BGR frame; landmark coordinates are normalized to the full frame"""
+        if self.roi is not None and self.roi_age < self.refresh_frames:
+            self.roi_age += 1
+            results = self.run(frame, self.roi)
+            found = self.landmark_lists(results)
+            if len(found) >= self.roi_count:
+                self.roi_frames += 1
+                self.update_roi(found)
+                return results
+        
+        # No crop yet, landmarks lost in the crop, or time for a full-frame check
+        self.roi = None
+        self.full_frames += 1
+        results = self.run(frame, None)
+        found = self.landmark_lists(results)
+        if found and len(found) >= self.min_lists and self.use_roi:
+            self.update_roi(found)
+            self.roi_count = len(found)
+            self.roi_age = 0
+        return results
+    
+    def run(self, frame, roi):
+        """Run the solution on the whole frame or a crop of it, downscaled to max_side"""
+        start = time.perf_counter()
+        h, w, _ = frame.shape
+        x0, y0, x1, y1 = 0, 0, w, h
+        if roi is not None:
+            x0, y0 = int(roi[0] * w), int(roi[1] * h)
+            x1, y1 = int(round(roi[2] * w)), int(round(roi[3] * h))
+        image = frame[y0:y1, x0:x1]
+        
+        # Downscale before the color conversion, so neither touches every full-resolution pixel
+        crop_h, crop_w, _ = image.shape
+        scale = self.max_side / max(crop_h, crop_w) if self.max_side else 1.0
+        if scale < 1.0:
+            image = cv2.resize(image, (round(crop_w * scale), round(crop_h * scale)), interpolation=cv2.INTER_AREA)
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        converted = time.perf_counter()
+        results = self.solution.process(image)
+        
+        # Map crop-normalized landmarks back to full-frame normalized coordinates
+        if roi is not None:
+            for landmarks in self.landmark_lists(results):
+                for landmark in landmarks.landmark:
+                    landmark.x = (x0 + landmark.x * crop_w) / w
+                    landmark.y = (y0 + landmark.y * crop_h) / h
+        
+        if self.stages is not None:
+            self.stages.add('convert', converted - start)
+            self.stages.add('inference', time.perf_counter() - converted)
+        return results
+    
+    def update_roi(self, found):
+        """Keep the crop while all landmarks stay well inside it, otherwise re-center it around them"""
+        xs = [landmark.x for landmarks in found for landmark in landmarks.landmark]
+        ys = [landmark.y for landmarks in found for landmark in landmarks.landmark]
+        left, right, top, bottom = min(xs), max(xs), min(ys), max(ys)
+        
+        if self.roi is not None:
+            x0, y0, x1, y1 = self.roi
+            edge_x = 0.1 * (x1 - x0)
+            edge_y = 0.1 * (y1 - y0)
+            if left > x0 + edge_x and right < x1 - edge_x and top > y0 + edge_y and bottom < y1 - edge_y:
+                return
+        
+        pad = self.margin * max(right - left, bottom - top)
+        half_w = max((right - left) / 2 + pad, self.min_roi_side / 2)
+        half_h = max((bottom - top) / 2 + pad, self.min_roi_side / 2)
+        cx, cy = (left + right) / 2, (top + bottom) / 2
+        roi = (max(0.0, cx - half_w), max(0.0, cy - half_h), min(1.0, cx + half_w), min(1.0, cy + half_h))
+        
+        # A crop covering most of the frame saves little; stay on the (downscaled) full frame
+        if (roi[2] - roi[0]) * (roi[3] - roi[1]) > 0.6:
+            self.roi = None
+        else:
+            self.roi = roi
+
+class HudLayer:
+    """A part of the overlay rendered once into sprites and masks, then pasted onto every frame.
+    
+    The layer is re-rendered only when its key (the state it shows) or the frame size
+    changes. Rendering happens twice, on a black and on a white canvas: pixels that come
+    out the same on both were drawn, so the mask also covers black boxes and text. The
+    drawn pixels are split into separate pieces (e.g. one per corner of the screen), so
+    pasting only touches the small regions that actually contain overlay.
+    """
+    
+    def __init__(self):
+        self.key = None
+        self.pieces = []  # (x, y, sprite, mask) per separate region; mask is None where fully opaque
+    
+    def draw(self, frame, key, render):
+        """Paste the layer onto the frame, calling render(canvas) first if key has changed"""
+        h, w, _ = frame.shape
+        if (key, w, h) != self.key:
+            self.render(w, h, render)
+            self.key = (key, w, h)
+        
+        for x, y, sprite, mask in self.pieces:
+            sprite_h, sprite_w, _ = sprite.shape
+            region = frame[y:y + sprite_h, x:x + sprite_w]
+            if mask is None:
+                region[:] = sprite
+            else:
+                cv2.copyTo(sprite, mask, region)
+    
+    def render(self, w, h, render):
+        """Render the layer and cut it into pieces around each group of drawn pixels"""
+        on_black = np.zeros((h, w, 3), np.uint8)
+        on_white = np.full((h, w, 3), 255, np.uint8)
+        render(on_black)
+        render(on_white)
+        mask = (on_black == on_white).all(axis=2)
+        
+        # Letters and lines close to each other end up in the same piece
+        grouped = cv2.dilate(mask.astype(np.uint8), np.ones((15, 15), np.uint8))
+        count, _, boxes, _ = cv2.connectedComponentsWithStats(grouped)
+        self.pieces = []
+        for x, y, box_w, box_h, _ in boxes[1:count]:
+            piece_mask = mask[y:y + box_h, x:x + box_w]
+            if not piece_mask.any():
+                continue
+            sprite = on_black[y:y + box_h, x:x + box_w].copy()
+            self.pieces.append((int(x), int(y), sprite, None if piece_mask.all() else piece_mask.astype(np.uint8)))
+
+class LandmarkRecorder:
+    """Collects the landmarks and timestamp of every frame in compact arrays, saved as one .npz file.
+    
+    Each frame stores up to `slots` landmark lists of `points` landmarks as float32
+    (x, y, z, visibility), NaN where nothing was detected, so a session can be replayed
+    through the detection logic (see replay.py) without running MediaPipe again.
+    """
+    
+    def __init__(self, name, slots, points):
+        self.name = name
+        self.slots = slots
+        self.points = points
+        self.timestamps = []
+        self.frames = []
+        self.frame_size = (0, 0)
+    
+    def add(self, timestamp, frame, landmark_lists):
+        """Record one frame's landmark lists (None when nothing was detected)"""
+        landmarks = np.full((self.slots, self.points, 4), np.nan, dtype=np.float32)
+        for i, landmark_list in enumerate((landmark_lists or [])[:self.slots]):
+            landmarks[i] = [(point.x, point.y, point.z, point.visibility) for point in landmark_list.landmark]
+        self.timestamps.append(timestamp)
+        self.frames.append(landmarks)
+        self.frame_size = frame.shape[:2]
+    
+    def save(self, path):
+        """Write the recording; timestamps are in seconds, frame_size is (height, width)"""
+        frames = np.stack(self.frames) if self.frames else np.empty((0, self.slots, self.points, 4), np.float32)
+        np.savez(path, timestamps=np.array(self.timestamps, dtype=np.float64),
+                 frame_size=np.array(self.frame_size), **{self.name: frames})
+        print(f"Landmarks of {len(self.frames)} frames recorded to {path}")
+
+# Tracker classes (HandstandTimer, HighKickTracker) plug into the functions below with:
+# TITLE (window title), RECORDING (LandmarkRecorder arguments), print_event(event),
+# process_frame(frame, timestamp), finish_frame(timestamp), process_video(...), close(),
+# and the stages, show_perf, recorder and events attributes.
+
+def tracking_worker(tracker_class, source, options, frames, events, stop, slots=4, show_perf=False,
+                    record_path=None, perf_csv=None):
+    """Headless tracking loop: capture, detect and draw, then publish each frame through shared memory"""
+    tracker = tracker_class(**options)
+    tracker.events = events
+    tracker.show_perf = show_perf
+    if record_path:
+        tracker.recorder = LandmarkRecorder(*tracker.RECORDING)
+    
+    # Frame messages are only worth anything while they are fresh; do not wait to flush them on exit
+    frames.cancel_join_thread()
+    capture = LatestFrameCapture(source)
+    ring = None
+    
+    tracker.stages.start()
+    while capture.is_opened() and not stop.is_set():
+        start = time.perf_counter()
+        ret, frame, captured_at = capture.read()
+        tracker.stages.add('capture', time.perf_counter() - start)
+        if not ret:
+            print("Failed to grab frame")
+            break
+        
+        processed_frame = tracker.process_frame(frame, captured_at)
+        if tracker.show_perf:
+            tracker.stages.draw(processed_frame)
+        
+        # Publishing replaces displaying: one copy into shared memory and a small message
+        start = time.perf_counter()
+        if ring is None:
+            ring = SharedFrameRing(processed_frame.shape, slots)
+            frames.put(("ring", ring.name, processed_frame.shape, slots))
+        frames.put(("frame", ring.write(processed_frame), captured_at))
+        tracker.stages.add('display', time.perf_counter() - start)
+        tracker.finish_frame(captured_at)
+    
+    # Clean up
+    capture.release()
+    tracker.close()
+    frames.put(("end",))
+    
+    # The viewer may still attach to the ring; it unlinks it once it has stopped the worker
+    stop.wait(timeout=5.0)
+    if ring is not None:
+        ring.close()
+    if tracker.recorder is not None:
+        tracker.recorder.save(record_path)
+    tracker.stages.print_summary()
+    if perf_csv:
+        tracker.stages.write_csv(perf_csv)
+
+def run_viewer(tracker_class, source=0, options=None, slots=4, show_perf=False, record_path=None, perf_csv=None):
+    """Track in a headless worker process and show its frames and events in this one"""
+    frames = multiprocessing.Queue()
+    events = multiprocessing.Queue()
+    stop = multiprocessing.Event()
+    # Share this process's resource tracker with the worker; one of its own would unlink the ring when it exits
+    if os.name == 'posix':
+        resource_tracker.ensure_running()
+    worker = multiprocessing.Process(target=tracking_worker, name='tracking-worker',
+                                     args=(tracker_class, source, options or {}, frames, events, stop, slots, show_perf,
+                                           record_path, perf_csv))
+    worker.start()
+    
+    # Set fullscreen window
+    cv2.namedWindow(tracker_class.TITLE, cv2.WND_PROP_FULLSCREEN)
+    cv2.setWindowProperty(tracker_class.TITLE, cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
+    
+    ring = None
+    frame = None  # Buffer the newest frame is copied into, reused for every frame
+    latencies = deque(maxlen=120)
+    skipped_frames = 0
+    running = True
+    try:
+        while running:
+            # Wait for a message, then take everything published since; only the newest frame is shown
+            try:
+                messages = [frames.get(timeout=1.0)]
+            except queue.Empty:
+                if not worker.is_alive():
+                    break
+                continue
+            while True:
+                try:
+                    messages.append(frames.get_nowait())
+                except queue.Empty:
+                    break
+            
+            latest = None
+            for message in messages:
+                if message[0] == "ring":
+                    ring = SharedFrameRing(message[2], message[3], name=message[1])
+                elif message[0] == "frame":
+                    skipped_frames += latest is not None
+                    latest = message
+                else:
+                    running = False
+            
+            # Scoreboard: print the events published by the worker
+            while True:
+                try:
+                    tracker_class.print_event(events.get_nowait())
+                except queue.Empty:
+                    break
+            
+            shown_at = None
+            if latest is not None and ring is not None:
+                _, sequence, captured_at = latest
+                if frame is None:
+                    frame = np.empty(ring.shape, dtype=np.uint8)
+                if ring.read(sequence, frame) is not None:
+                    cv2.imshow(tracker_class.TITLE, frame)
+                    shown_at = captured_at
+            key = cv2.waitKey(1) & 0xFF
+            if shown_at is not None:
+                latencies.append(time.perf_counter() - shown_at)
+            
+            # Exit on 'q' key press
+            if key == ord('q'):
+                break
+    finally:
+        # Stop the worker, keep delivering its last events while it shuts down
+        stop.set()
+        deadline = time.perf_counter() + 10.0
+        while worker.is_alive() and time.perf_counter() < deadline:
+            worker.join(timeout=0.1)
+            while True:
+                try:
+                    tracker_class.print_event(events.get_nowait())
+                except queue.Empty:
+                    break
+        if worker.is_alive():
+            worker.terminate()
+        
+        cv2.destroyAllWindows()
+        if ring is not None:
+            ring.close(unlink=True)
+    
+    if latencies:
+        latencies = sorted(1000 * latency for latency in latencies)
+        print(f"Latency (capture to display): mean {sum(latencies) / len(latencies):.0f} ms, "
+              f"p95 {latencies[int(0.95 * (len(latencies) - 1))]:.0f} ms; "
+              f"{skipped_frames} frames skipped by the viewer")
+
+def analyze_video(tracker_class, video_path, annotate_dir=None, options=None, record_dir=None):
+    """Run a fresh tracker over one video; errors are reported in the result instead of raised"""
+    annotated_path = Path(annotate_dir) / f"{Path(video_path).stem}_annotated.mp4" if annotate_dir else None
+    record_path = Path(record_dir) / f"{Path(video_path).stem}_landmarks.npz" if record_dir else None
+    try:
+        return tracker_class(**(options or {})).process_video(video_path, annotated_path, record_path)
+    except Exception as e:
+        return {"video": str(video_path), "error": str(e)}
+
+def process_videos(tracker_class, video_paths, workers=None, annotate_dir=None, options=None, record_dir=None):
+    """Analyze several videos, one worker process per video up to the number of CPU cores"""
+    for directory in (annotate_dir, record_dir):
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+    workers = min(len(video_paths), workers or os.cpu_count() or 1)
+    if workers <= 1:
+        return [analyze_video(tracker_class, path, annotate_dir, options, record_dir) for path in video_paths]
+    
+    count = len(video_paths)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(analyze_video, [tracker_class] * count, video_paths, [annotate_dir] * count,
+                             [options] * count, [record_dir] * count))
+
+# One recorded landmark, with the attribute names of MediaPipe's landmarks
+Point = namedtuple('Point', ['x', 'y', 'z', 'visibility'])
+
+class RecordedLandmarks:
+    """A recorded landmark list, indexed like MediaPipe's landmark lists (hand_landmarks.landmark etc.)"""
+    
+    def __init__(self, points):
+        self.landmark = [Point(*point) for point in points]
+
+class Recording:
+    """A landmark recording (written with --record) loaded for replay"""
+    
+    def __init__(self, path, name):
+        self.path = Path(path)
+        with np.load(path) as data:
+            self.frame_size = tuple(int(size) for size in data['frame_size'])
+            timestamps = data['timestamps'].tolist()
+            recorded = data[name].tolist()
+        
+        # Build the landmark objects once; every replay of the recording reuses them.
+        # Each frame has its detected landmark lists, or None when nothing was detected
+        self.frames = []
+        for timestamp, frame_lists in zip(timestamps, recorded):
+            landmark_lists = [RecordedLandmarks(points) for points in frame_lists if not math.isnan(points[0][0])]
+            self.frames.append((timestamp, landmark_lists or None))
+
+def find_recordings(paths):
+    """Recording files from the given files and directories (all .npz files in a directory)"""
+    recordings = []
+    for path in map(Path, paths):
+        recordings += sorted(path.glob('*.npz')) if path.is_dir() else [path]
+    return recordings
+
+def parse_sweep(tracker_class, specs):
+    """Turn NAME=V1,V2,... specs into lists of values, typed like the tracker's constants"""
+    defaults = tracker_class(standalone=False)
+    grid = {}
+    for spec in specs:
+        name, _, values = spec.partition('=')
+        if not name.isupper() or not hasattr(defaults, name) or not values:
+            raise ValueError(f"'{spec}' is not NAME=V1,V2,... for a {tracker_class.__name__} constant")
+        # Parsed with the constant's own type, so an int constant rejects 2.5 instead of truncating it
+        kind = type(getattr(defaults, name))
+        try:
+            grid[name] = [kind(value) for value in values.split(',')]
+        except ValueError:
+            raise ValueError(f"'{spec}': {name} takes {kind.__name__} values") from None
+    return grid
+
+def sweep(recordings, grid, replay, summarize):
+    """Replay every recording with every combination of the swept constants.
+    
+    replay(recording, params) returns the results of one recording; summarize turns the
+    results of all recordings into the summary fields of the combination's row.
+    """
+    names = list(grid)
+    frames = sum(len(recording.frames) for recording in recordings)
+    
+    rows = []
+    for values in itertools.product(*(grid[name] for name in names)):
+        params = dict(zip(names, values))
+        start = time.perf_counter()
+        results = {str(recording.path): replay(recording, params) for recording in recordings}
+        elapsed = time.perf_counter() - start
+        
+        rows.append({
+            "params": params,
+            **summarize(results),
+            "frames_per_sec": frames / elapsed if elapsed > 0 else 0.0,
+            "recordings": results,
+        })
+    return rows
+
+def benchmark_video(run_once, video_path, repeat=3, warmup=30, threads=None, options=None, csv_path=None):
+    """Process a video several times and report the median frame rate and stage percentiles.
+    
+    run_once(video_path, options) processes the video once with a fresh tracker and
+    returns its StageTimer and what it detected (rounded, so runs can be compared).
+    """
+    options = options or {}
+    if threads:
+        cv2.setNumThreads(threads)
+    
+    summaries = []
+    detections = []
+    for i in range(repeat):
+        stages, detected = run_once(video_path, options)
+        # The first frames include model start-up and are left out of the statistics
+        summary = stages.summary(skip=warmup)
+        if not summary["frames"]:
+            raise ValueError(f"'{video_path}' has no frames after the {warmup} warm-up frames")
+        summaries.append(summary)
+        detections.append(detected)
+        print(f"Run {i + 1}/{repeat}: {summary['fps']:.1f} frames/sec")
+    
+    # Per-frame timings of the last run
+    if csv_path:
+        stages.write_csv(csv_path)
+    
+    return {
+        "video": str(video_path),
+        "frames": summaries[0]["frames"],
+        "warmup_frames": warmup,
+        "repeat": repeat,
+        "options": options,
+        "opencv_threads": cv2.getNumThreads(),
+        "python": platform.python_version(),
+        "opencv": cv2.__version__,
+        "mediapipe": getattr(mp, '__version__', 'unknown'),
+        "fps": statistics.median(summary["fps"] for summary in summaries),
+        "fps_runs": [summary["fps"] for summary in summaries],
+        "stages": {column: {stat: statistics.median(summary[column][stat] for summary in summaries)
+                            for stat in summaries[0][column]}
+                   for column in StageTimer.COLUMNS},
+        # The detection logic is deterministic, so every run must detect the same
+        "consistent": all(found == detections[0] for found in detections),
+        "detections": detections[0],
+    }
+
+def print_benchmark(report):
+    """Print the median frame rate and stage percentiles of a benchmark"""
+    print(f"\n{report['video']}: {report['frames']} frames, median of {report['repeat']} runs")
+    print(f"Frame rate: {report['fps']:.1f} frames/sec "
+          f"(runs: {', '.join(f'{fps:.1f}' for fps in report['fps_runs'])})")
+    print(f"{'Stage':<12}{'mean ms':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for column, s in report["stages"].items():
+        print(f"{column:<12}{s['mean_ms']:>9.2f}{s['p50_ms']:>9.2f}{s['p95_ms']:>9.2f}{s['p99_ms']:>9.2f}")
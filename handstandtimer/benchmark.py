@@ -0,0 +1,42 @@
+import argparse
+import json
+
+from handstandtimer import HandstandTimer
+from tracking import benchmark_video, print_benchmark
+
+def run_once(video_path, options):
+    """Time the attempts of a video with a fresh timer; returns its StageTimer and the durations found"""
+    timer = HandstandTimer(**options)
+    timer.verbose = False
+    # Draw every frame as the live loop does, so landmark, overlay and display times are measured
+    result = timer.process_video(video_path, draw=True)
+    return timer.stages, [round(attempt["duration_sec"], 3) for attempt in result["attempts"]]
+
+def main():
+    """Benchmark the Handstand Timer's frame loop on a recorded video"""
+    parser = argparse.ArgumentParser(description='Benchmark the Handstand Timer stage by stage on a recorded video.')
+    parser.add_argument('video', help='Video file replayed as the camera')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs over the video (default: 3)')
+    parser.add_argument('--warmup', type=int, default=30, help='Frames left out of the statistics (default: 30)')
+    parser.add_argument('--threads', type=int, default=None, help='OpenCV worker threads (default: OpenCV decides)')
+    parser.add_argument('--json', help='Write the results to this JSON file')
+    parser.add_argument('--csv', help='Write the per-frame stage timings of the last run to this CSV file')
+    parser.add_argument('--inference-size', type=int, default=640,
+                        help='Longest side of the image passed to MediaPipe (0 = full resolution, default: 640)')
+    parser.add_argument('--no-roi', action='store_true',
+                        help='Always run detection on the whole frame instead of a crop around the last landmarks')
+    args = parser.parse_args()
+    options = dict(inference_max_side=args.inference_size, use_roi=not args.no_roi)
+    
+    report = benchmark_video(run_once, args.video, args.repeat, args.warmup, args.threads, options, args.csv)
+    print_benchmark(report)
+    print(f"Attempts: {', '.join(f'{duration:.2f}s' for duration in report['detections']) or 'none'}"
+          + ("" if report["consistent"] else " (runs disagree!)"))
+    
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -1,33 +1,98 @@
+import argparse
+import csv
+import json
+import os
+import sys
 import cv2
 import mediapipe as mp
 import time
+from collections import deque
+from pathlib import Path
+
+# Capture, timing, inference and recording helpers shared with the High Kick Tracker
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'common'))
+
+from tracking import (AdaptiveInference, HudLayer, LandmarkRecorder, LatestFrameCapture, StageTimer,
+                      process_videos, run_viewer)
 
 class HandstandTimer:
-    def __init__(self):
+    TITLE = 'Handstand Timer'
+    RECORDING = ('hands', 2, 21)  # Recorded landmarks: up to 2 hands of 21 points
+    
+    def __init__(self, inference_max_side=640, use_roi=True, standalone=True):
         # Initialize MediaPipe Hands
         self.mp_hands = mp.solutions.hands
-        self.hands = self.mp_hands.Hands(
-            static_image_mode=False,
-            max_num_hands=2,
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
         self.mp_drawing = mp.solutions.drawing_utils
+        self.hands = None
+        self.inference = None
+        
+        # Time spent in each stage of the frame loop, and whether the live overlay shows it ('p' toggles)
+        self.stages = StageTimer()
+        self.show_perf = False
+        
+        # Without standalone, landmarks come from a shared engine (see multitracker) and no model is loaded
+        if standalone:
+            self.hands = self.mp_hands.Hands(
+                static_image_mode=False,
+                max_num_hands=2,
+                min_detection_confidence=0.5,
+                min_tracking_confidence=0.5
+            )
+            
+            # Hand detection runs on a downscaled frame, or on a crop around the hands once both are found
+            self.inference = AdaptiveInference(self.hands, lambda results: results.multi_hand_landmarks or [],
+                                               max_side=inference_max_side, use_roi=use_roi, margin=0.5,
+                                               stages=self.stages, min_lists=2)
         
         # Timer variables
         self.start_time = None
         self.end_time = None
         self.is_timing = False
         self.timer_history = []
+        self.attempts = []  # start, end and duration of every attempt, for offline reports
         self.MAX_ATTEMPTS = 10
         self.exit_prompt_shown = False
         
+        # Overlay parts that only change with the attempts, pre-rendered
+        self.hud = HudLayer()
+        
         # Constants for hand position detection
         self.GROUND_THRESHOLD_RATIO = 0.85  # Lower threshold means higher up in the frame (since 0,0 is top-left)
         self.MIN_HANDS_FOR_HANDSTAND = 2
-        self.STABLE_FRAMES_REQUIRED = 5
-        self.stable_frame_counter = 0
         
+        # Announce started and stopped attempts on the console (off when replaying recordings;
+        # in a tracking worker, the viewer prints the events instead)
+        self.verbose = True
+        self.STABLE_TIME_REQUIRED_MS = 150.0  # Both hands must stay down this long before an attempt counts
+        self.hands_down_since = None
+        
+        # Time of the frame being processed: its monotonic capture or video timestamp, in seconds.
+        # All timing uses it, so dropped or skipped frames do not change the measured durations.
+        self.frame_time = None
+        
+        # Capture-to-display latency of recent frames (seconds) and stale camera frames dropped
+        self.frame_latencies = deque(maxlen=120)
+        self.dropped_frames = 0
+        
+        # LandmarkRecorder while a session is being recorded for replay
+        self.recorder = None
+        
+        # Queue for attempt and kick events when tracking runs in a worker process (see tracking_worker)
+        self.events = None
+    
+    def emit(self, event, **fields):
+        """Publish an event on the events queue, when tracking runs in a worker process"""
+        if self.events is not None:
+            self.events.put(dict(fields, event=event))
+    
+    @staticmethod
+    def print_event(event):
+        """Show an event published by the tracking worker"""
+        if event["event"] == "attempt_started":
+            print("Timing started!")
+        elif event["event"] == "attempt_stopped":
+            print(f"Attempt {event['attempt']}: {event['duration_sec']:.2f} seconds")
+    
     def hands_on_ground(self, hand_landmarks, frame_height):
         """Check if the hand appears to be on the ground (bottom of frame)"""
         # Check if wrist and fingers are near the bottom of the frame
@@ -44,77 +109,110 @@ class HandstandTimer:
         
         return False
     
-    def process_frame(self, frame):
-        # Convert the BGR image to RGB
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        h, w, _ = frame.shape
+    def process_frame(self, frame, timestamp=None, draw=True):
+        # Detect hands on a downscaled frame or a crop around them; landmarks come back in full-frame coordinates
+        results = self.inference.process(frame)
+        self.analyze_frame(frame, results.multi_hand_landmarks, timestamp, draw)
+        
+        # Keep the landmarks for replaying the session without inference
+        if self.recorder is not None:
+            self.recorder.add(self.frame_time, frame, results.multi_hand_landmarks)
         
-        # Process the frame and detect hands
-        results = self.hands.process(rgb_frame)
+        return frame
+    
+    def analyze_frame(self, frame, multi_hand_landmarks, timestamp=None, draw=True):
+        """Update the timer from one frame's hand landmarks; draw=False leaves the frame untouched"""
+        # Attempts are timed by frame timestamps (the monotonic clock when none is given)
+        self.frame_time = time.perf_counter() if timestamp is None else timestamp
+        
+        h, w, _ = frame.shape
         
         # Draw hand annotations on the frame
-        if results.multi_hand_landmarks:
+        if multi_hand_landmarks:
             hands_on_ground_count = 0
             
-            for hand_landmarks in results.multi_hand_landmarks:
-                self.mp_drawing.draw_landmarks(
-                    frame, hand_landmarks, self.mp_hands.HAND_CONNECTIONS)
+            for hand_landmarks in multi_hand_landmarks:
+                if draw:
+                    start = time.perf_counter()
+                    self.mp_drawing.draw_landmarks(
+                        frame, hand_landmarks, self.mp_hands.HAND_CONNECTIONS)
+                    self.stages.add('landmarks', time.perf_counter() - start)
                 
                 if self.hands_on_ground(hand_landmarks, h):
                     hands_on_ground_count += 1
             
             # Check if both hands are on the ground
             if hands_on_ground_count >= self.MIN_HANDS_FOR_HANDSTAND:
-                self.stable_frame_counter += 1
-                if self.stable_frame_counter >= self.STABLE_FRAMES_REQUIRED and not self.is_timing:
+                if self.hands_down_since is None:
+                    self.hands_down_since = self.frame_time
+                if (self.frame_time - self.hands_down_since >= self.STABLE_TIME_REQUIRED_MS / 1000
+                        and not self.is_timing):
                     self.start_timing()
             else:
                 # If hands were on ground and now they're not, stop timing
                 if self.is_timing:
                     self.stop_timing()
-                self.stable_frame_counter = 0
+                self.hands_down_since = None
         else:
             # No hands detected, stop timing if it was running
             if self.is_timing:
                 self.stop_timing()
-            self.stable_frame_counter = 0
+            self.hands_down_since = None
         
         # Display timer info on frame
-        self.add_timer_info(frame)
+        start = time.perf_counter()
+        if draw:
+            self.add_timer_info(frame)
         
         # Check if maximum attempts reached and show prompt
         if len(self.timer_history) >= self.MAX_ATTEMPTS and not self.exit_prompt_shown:
-            self.display_exit_prompt(frame)
+            if draw:
+                self.display_exit_prompt(frame)
             self.exit_prompt_shown = True
+        self.stages.add('overlay', time.perf_counter() - start)
         
         return frame
     
     def start_timing(self):
         """Start the handstand timer"""
-        self.start_time = time.time()
+        # The attempt began when the hands went down; the stable time only confirmed it
+        self.start_time = self.frame_time if self.hands_down_since is None else self.hands_down_since
         self.is_timing = True
-        print("Timing started!")
+        self.emit("attempt_started", start_sec=self.start_time)
+        if self.verbose and self.events is None:
+            print("Timing started!")
     
     def stop_timing(self):
         """Stop the handstand timer and record the duration"""
         if self.is_timing:
-            self.end_time = time.time()
+            self.end_time = self.frame_time
             duration = self.end_time - self.start_time
             self.timer_history.append(duration)
+            self.attempts.append({"attempt": len(self.timer_history), "start_sec": self.start_time,
+                                  "end_sec": self.end_time, "duration_sec": duration})
             self.is_timing = False
-            print(f"Timing stopped! Duration: {duration:.2f} seconds")
+            self.emit("attempt_stopped", **self.attempts[-1])
+            if self.verbose and self.events is None:
+                print(f"Timing stopped! Duration: {duration:.2f} seconds")
     
     def add_timer_info(self, frame):
         """Add timer information to the frame"""
-        h, w, _ = frame.shape
+        # Everything but the running time only changes with the attempts and is pasted from a cached sprite
+        self.hud.draw(frame, (tuple(self.timer_history), self.is_timing), self.render_timer_info)
         
-        # Current timer or last record
+        # Current timer
         if self.is_timing:
-            current_time = time.time() - self.start_time
+            current_time = self.frame_time - self.start_time
             timer_text = f"Time: {current_time:.2f} s"
             cv2.putText(frame, timer_text, (20, 60), 
                         cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-        elif self.timer_history:
+    
+    def render_timer_info(self, frame):
+        """Draw the timer information that only changes with the attempts (see HudLayer)"""
+        h, w, _ = frame.shape
+        
+        # Last record
+        if self.timer_history and not self.is_timing:
             last_time = self.timer_history[-1]
             timer_text = f"Last: {last_time:.2f} s"
             cv2.putText(frame, timer_text, (20, 60), 
@@ -172,14 +270,34 @@ class HandstandTimer:
             cv2.putText(frame, attempt_text, (w - 200, y_pos), 
                         cv2.FONT_HERSHEY_SIMPLEX, 0.7, text_color, 2)
     
+    def add_latency_info(self, frame):
+        """Show the measured capture-to-display latency and the number of dropped frames"""
+        if not self.frame_latencies:
+            return
+        h, w, _ = frame.shape
+        
+        latency_ms = 1000 * sum(self.frame_latencies) / len(self.frame_latencies)
+        latency_text = f"Latency: {latency_ms:.0f} ms  Dropped: {self.dropped_frames}"
+        cv2.putText(frame, latency_text, (w - 330, h - 20), 
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (200, 200, 200), 1)
+    
+    def latency_stats(self):
+        """Mean, 95th percentile and maximum latency in ms over recent frames, and dropped frames"""
+        stats = {"dropped_frames": self.dropped_frames}
+        if self.frame_latencies:
+            latencies = sorted(1000 * latency for latency in self.frame_latencies)
+            stats["mean_ms"] = sum(latencies) / len(latencies)
+            stats["p95_ms"] = latencies[int(0.95 * (len(latencies) - 1))]
+            stats["max_ms"] = latencies[-1]
+        return stats
+    
     def display_exit_prompt(self, frame):
         """Display exit prompt after maximum attempts reached"""
         h, w, _ = frame.shape
         
-        # Create semi-transparent overlay
-        overlay = frame.copy()
-        cv2.rectangle(overlay, (int(w/4), int(h/3)), (int(3*w/4), int(2*h/3)), (0, 0, 0), -1)
-        cv2.addWeighted(overlay, 0.7, frame, 0.3, 0, frame)
+        # Darken the prompt box (a 70% black overlay) without copying the whole frame
+        box = frame[int(h/3):int(2*h/3) + 1, int(w/4):int(3*w/4) + 1]
+        box[:] = cv2.convertScaleAbs(box, alpha=0.3)
         
         # Display prompt text
         prompt_text1 = "Maximum attempts reached!"
@@ -199,30 +317,58 @@ class HandstandTimer:
         cv2.putText(frame, prompt_text2, (text_x2, text_y2), 
                     cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 255), 2)
     
-    def run(self):
+    def finish_frame(self, timestamp):
+        """Close the stage timings of a frame once it has been shown or written"""
+        self.stages.end_frame(timestamp)
+    
+    def close(self):
+        """Stop an attempt still in progress and release the hand model"""
+        self.stop_timing()
+        if self.hands is not None:
+            self.hands.close()
+    
+    def run(self, record_path=None, perf_csv=None):
         """Main method to run the handstand timer"""
-        # Initialize webcam
-        cap = cv2.VideoCapture(0)
+        # Initialize webcam; frames are captured on a background thread that keeps only the newest
+        capture = LatestFrameCapture(0)
+        if record_path:
+            self.recorder = LandmarkRecorder(*self.RECORDING)
         
         # Set fullscreen window
         cv2.namedWindow('Handstand Timer', cv2.WND_PROP_FULLSCREEN)
         cv2.setWindowProperty('Handstand Timer', cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
         
-        while cap.isOpened():
-            ret, frame = cap.read()
+        self.stages.start()
+        while capture.is_opened():
+            start = time.perf_counter()
+            ret, frame, captured_at = capture.read()
+            self.stages.add('capture', time.perf_counter() - start)
             if not ret:
                 print("Failed to grab frame")
                 break
             
             # Process the frame
-            processed_frame = self.process_frame(frame)
+            processed_frame = self.process_frame(frame, captured_at)
             
             # Display the frame
+            self.add_latency_info(processed_frame)
+            if self.show_perf:
+                self.stages.draw(processed_frame)
+            start = time.perf_counter()
             cv2.imshow('Handstand Timer', processed_frame)
+            key = cv2.waitKey(1) & 0xFF
+            self.stages.add('display', time.perf_counter() - start)
+            self.finish_frame(captured_at)
+            
+            # The frame is on screen once waitKey returns
+            self.frame_latencies.append(time.perf_counter() - captured_at)
+            self.dropped_frames = capture.dropped_frames
             
-            # Exit on 'q' key press
-            if cv2.waitKey(1) & 0xFF == ord('q'):
+            # Exit on 'q' key press, show or hide the stage timings on 'p'
+            if key == ord('q'):
                 break
+            if key == ord('p'):
+                self.show_perf = not self.show_perf
             
             # Force exit prompt after maximum attempts
             if len(self.timer_history) >= self.MAX_ATTEMPTS:
@@ -230,16 +376,156 @@ class HandstandTimer:
                 pass
         
         # Clean up
-        cap.release()
+        capture.release()
         cv2.destroyAllWindows()
-        self.hands.close()
+        self.close()
+        if self.recorder is not None:
+            self.recorder.save(record_path)
+        
+        stats = self.latency_stats()
+        if "mean_ms" in stats:
+            print(f"Latency (capture to display): mean {stats['mean_ms']:.0f} ms, "
+                  f"p95 {stats['p95_ms']:.0f} ms; {stats['dropped_frames']} stale frames dropped")
+        self.stages.print_summary()
+        if perf_csv:
+            self.stages.write_csv(perf_csv)
+    
+    def process_video(self, video_path, annotated_path=None, record_path=None, draw=None):
+        """Time the attempts in a recorded video as fast as possible, without a window.
+        
+        Landmarks and HUD are drawn when draw is set, by default only for an annotated video.
+        Drawn frames that are not written are JPEG-encoded in memory instead, as a stand-in
+        for displaying them, so benchmarks time the same stages as the live loop.
+        """
+        draw = bool(annotated_path) if draw is None else draw
+        cap = cv2.VideoCapture(str(video_path))
+        if not cap.isOpened():
+            raise ValueError(f"Cannot open video '{video_path}'")
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        if record_path:
+            self.recorder = LandmarkRecorder(*self.RECORDING)
+        
+        writer = None
+        frame_count = 0
+        self.stages.start()
+        while True:
+            start = time.perf_counter()
+            ret, frame = cap.read()
+            self.stages.add('capture', time.perf_counter() - start)
+            if not ret:
+                break
+            
+            # Every frame is processed; its time comes from the frame rate, not the clock
+            timestamp = frame_count / fps
+            processed_frame = self.process_frame(frame, timestamp, draw)
+            frame_count += 1
+            
+            # Optionally write the annotated frame, or encode the drawn one in place of showing it
+            start = time.perf_counter()
+            if annotated_path:
+                if writer is None:
+                    h, w, _ = processed_frame.shape
+                    writer = cv2.VideoWriter(str(annotated_path), cv2.VideoWriter_fourcc(*'mp4v'), fps, (w, h))
+                writer.write(processed_frame)
+                self.stages.add('display', time.perf_counter() - start)
+            elif draw:
+                cv2.imencode('.jpg', processed_frame)
+                self.stages.add('display', time.perf_counter() - start)
+            self.finish_frame(timestamp)
+        
+        # Clean up; an attempt still running when the video ends stops with it
+        cap.release()
+        if writer is not None:
+            writer.release()
+        self.close()
+        if self.recorder is not None:
+            self.recorder.save(record_path)
+        
+        return {
+            "video": str(video_path),
+            "frames": frame_count,
+            "fps": fps,
+            "duration_sec": frame_count / fps,
+            "stages": self.stages.summary(),
+            "best_sec": max(self.timer_history) if self.timer_history else None,
+            "attempts": self.attempts,
+        }
+
+def write_results(results, json_path=None, csv_path=None):
+    """Write the attempts of every video as JSON and/or as CSV with one row per attempt"""
+    if json_path:
+        with open(json_path, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {json_path}")
+    
+    if csv_path:
+        with open(csv_path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(["video", "attempt", "start_sec", "end_sec", "duration_sec"])
+            for result in results:
+                for attempt in result.get("attempts", []):
+                    writer.writerow([result["video"], attempt["attempt"], f"{attempt['start_sec']:.3f}",
+                                     f"{attempt['end_sec']:.3f}", f"{attempt['duration_sec']:.3f}"])
+        print(f"Results written to {csv_path}")
+
+def main():
+    """Run the live timer, or analyze recorded videos when video files are given"""
+    parser = argparse.ArgumentParser(description='Time handstands from the webcam or from recorded videos.')
+    parser.add_argument('videos', nargs='*', help='Recorded videos to analyze headless (default: live webcam)')
+    parser.add_argument('--workers', '-w', type=int, default=None,
+                        help='Videos analyzed in parallel processes (default: number of CPU cores)')
+    parser.add_argument('--json', help='Write the attempts of every video to this JSON file')
+    parser.add_argument('--csv', help='Write one row per attempt to this CSV file')
+    parser.add_argument('--annotate', metavar='DIR', help='Write annotated copies of the videos to this directory')
+    parser.add_argument('--inference-size', type=int, default=640,
+                        help='Longest side of the image passed to MediaPipe (0 = full resolution, default: 640)')
+    parser.add_argument('--no-roi', action='store_true',
+                        help='Always run detection on the whole frame instead of a crop around the last landmarks')
+    parser.add_argument('--split', action='store_true',
+                        help='Track in a headless worker process and show its frames from shared memory (live only)')
+    parser.add_argument('--perf', action='store_true',
+                        help='Show frame rate and per-stage timings on screen (toggle with p)')
+    parser.add_argument('--perf-csv', metavar='FILE', help='Write the stage timings of every frame to this CSV file on exit')
+    parser.add_argument('--record', metavar='DIR',
+                        help='Save the landmarks of every frame to this directory for replay.py')
+    args = parser.parse_args()
+    options = dict(inference_max_side=args.inference_size, use_roi=not args.no_roi)
+    
+    if not args.videos:
+        print("Starting Handstand Timer...")
+        print("Position yourself so both hands are visible in the frame.")
+        print("Timer will start when both hands are detected on the ground.")
+        print("You have 10 attempts before the app will prompt to exit.")
+        print("Press 'q' to quit.")
+        
+        record_path = None
+        if args.record:
+            os.makedirs(args.record, exist_ok=True)
+            record_path = Path(args.record) / f"live_{time.strftime('%Y%m%d_%H%M%S')}_landmarks.npz"
+        
+        if args.split:
+            run_viewer(HandstandTimer, 0, options, show_perf=args.perf, record_path=record_path, perf_csv=args.perf_csv)
+            return
+        
+        timer = HandstandTimer(**options)
+        timer.show_perf = args.perf
+        timer.run(record_path, args.perf_csv)
+        return
+    
+    start = time.perf_counter()
+    results = process_videos(HandstandTimer, args.videos, args.workers, args.annotate, options, args.record)
+    elapsed = time.perf_counter() - start
+    
+    for result in results:
+        if "error" in result:
+            print(f"{result['video']}: error: {result['error']}")
+            continue
+        times = ", ".join(f"{attempt['duration_sec']:.2f}s" for attempt in result["attempts"]) or "none"
+        print(f"{result['video']}: {len(result['attempts'])} attempts ({times})")
+    frames = sum(result.get("frames", 0) for result in results)
+    print(f"Processed {frames} frames in {elapsed:.1f}s ({frames / max(elapsed, 1e-9):.0f} frames/sec)")
+    
+    write_results(results, args.json, args.csv)
 
 if __name__ == "__main__":
-    print("Starting Handstand Timer...")
-    print("Position yourself so both hands are visible in the frame.")
-    print("Timer will start when both hands are detected on the ground.")
-    print("You have 10 attempts before the app will prompt to exit.")
-    print("Press 'q' to quit.")
-    
-    timer = HandstandTimer()
-    timer.run()
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -0,0 +1,69 @@
+import argparse
+import json
+import numpy as np
+
+from handstandtimer import HandstandTimer
+from tracking import Recording, find_recordings, parse_sweep, sweep
+
+def replay(recording, params=None):
+    """Feed a recording through HandstandTimer's detection logic with some constants changed; returns the attempts"""
+    timer = HandstandTimer(standalone=False)
+    timer.verbose = False
+    for name, value in (params or {}).items():
+        setattr(timer, name, value)
+    
+    # Nothing is drawn, so only the frame's size is used
+    frame = np.empty((*recording.frame_size, 3), dtype=np.uint8)
+    for timestamp, multi_hand_landmarks in recording.frames:
+        timer.analyze_frame(frame, multi_hand_landmarks, timestamp, draw=False)
+    
+    # An attempt still running when the recording ends stops with it
+    timer.stop_timing()
+    return timer.attempts
+
+def summarize(attempts):
+    """Number, best and mean duration of the attempts found in all recordings"""
+    durations = [attempt["duration_sec"] for found in attempts.values() for attempt in found]
+    return {
+        "attempts": len(durations),
+        "best_sec": max(durations) if durations else None,
+        "mean_sec": sum(durations) / len(durations) if durations else None,
+    }
+
+def main():
+    """Replay landmark recordings through the timer logic, optionally sweeping its constants"""
+    parser = argparse.ArgumentParser(description='Replay recorded hand landmarks to tune the Handstand Timer.')
+    parser.add_argument('recordings', nargs='+', help='Landmark recordings (.npz) or directories of them')
+    parser.add_argument('--sweep', action='append', default=[], metavar='NAME=V1,V2,...',
+                        help='Constant to sweep, e.g. GROUND_THRESHOLD_RATIO=0.8,0.85,0.9 (repeatable)')
+    parser.add_argument('--json', help='Write every combination with its attempts to this JSON file')
+    args = parser.parse_args()
+    
+    try:
+        grid = parse_sweep(HandstandTimer, args.sweep)
+    except ValueError as e:
+        parser.error(str(e))
+    
+    recordings = [Recording(path, 'hands') for path in find_recordings(args.recordings)]
+    if not recordings:
+        parser.error("No recordings found")
+    frames = sum(len(recording.frames) for recording in recordings)
+    print(f"Replaying {len(recordings)} recordings ({frames} frames)")
+    
+    rows = sweep(recordings, grid, replay, summarize)
+    
+    header = "".join(f"{name:>26}" for name in grid) + f"{'Attempts':>10}{'Best s':>9}{'Mean s':>9}{'frames/s':>11}"
+    print(header)
+    for row in rows:
+        best = f"{row['best_sec']:.2f}" if row["best_sec"] is not None else "-"
+        mean = f"{row['mean_sec']:.2f}" if row["mean_sec"] is not None else "-"
+        print("".join(f"{value:>26}" for value in row["params"].values())
+              + f"{row['attempts']:>10}{best:>9}{mean:>9}{row['frames_per_sec']:>11.0f}")
+    
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(rows, f, indent=2)
+        print(f"Results written to {args.json}")
+
+if __name__ == "__main__":
+    main()
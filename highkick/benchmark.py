@@ -0,0 +1,41 @@
+import argparse
+import json
+
+from highkick import HighKickTracker
+from tracking import benchmark_video, print_benchmark
+
+def run_once(video_path, options):
+    """Measure the kicks of a video with a fresh tracker; returns its StageTimer and the kick heights found"""
+    tracker = HighKickTracker(**options)
+    # Draw every frame as the live loop does, so landmark, overlay and display times are measured
+    result = tracker.process_video(video_path, draw=True)
+    return tracker.stages, [round(kick["height_percent"], 2) for kick in result["kicks"]]
+
+def main():
+    """Benchmark the High Kick Tracker's frame loop on a recorded video"""
+    parser = argparse.ArgumentParser(description='Benchmark the High Kick Tracker stage by stage on a recorded video.')
+    parser.add_argument('video', help='Video file replayed as the camera')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs over the video (default: 3)')
+    parser.add_argument('--warmup', type=int, default=30, help='Frames left out of the statistics (default: 30)')
+    parser.add_argument('--threads', type=int, default=None, help='OpenCV worker threads (default: OpenCV decides)')
+    parser.add_argument('--json', help='Write the results to this JSON file')
+    parser.add_argument('--csv', help='Write the per-frame stage timings of the last run to this CSV file')
+    parser.add_argument('--inference-size', type=int, default=640,
+                        help='Longest side of the image passed to MediaPipe (0 = full resolution, default: 640)')
+    parser.add_argument('--no-roi', action='store_true',
+                        help='Always run detection on the whole frame instead of a crop around the last landmarks')
+    args = parser.parse_args()
+    options = dict(inference_max_side=args.inference_size, use_roi=not args.no_roi)
+    
+    report = benchmark_video(run_once, args.video, args.repeat, args.warmup, args.threads, options, args.csv)
+    print_benchmark(report)
+    print(f"Kicks: {', '.join(f'{height:.1f}%' for height in report['detections']) or 'none'}"
+          + ("" if report["consistent"] else " (runs disagree!)"))
+    
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -1,129 +1,387 @@
+import argparse
+import copy
+import csv
+import json
+import os
+import sys
 import cv2
 import mediapipe as mp
+import numpy as np
+import statistics
 import time
+from collections import deque
+from pathlib import Path
+
+# Capture, timing, inference and recording helpers shared with the Handstand Timer
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'common'))
+
+from tracking import (AdaptiveInference, HudLayer, LandmarkRecorder, LatestFrameCapture, StageTimer,
+                      process_videos, run_viewer)
+
+class AdaptiveFidelity:
+    """Chooses the Pose model complexity and how often to run it, to hold a target frame rate.
+    
+    The levels go from the most to the least expensive: model complexity 2, 1 and 0 on
+    every frame, then complexity 0 on every 2nd and every 3rd frame. Once `window`
+    frames have been measured at a level, their mean processing time is compared with
+    the frame budget: over budget moves to the next cheaper level, well under it back
+    to the more expensive one (unless that one was recently measured over budget).
+    Frames between inferences get landmarks predicted linearly from the last two
+    inferences, unless the caller's `needs_inference` check rejects the prediction.
+    While boosted (during a kick) every frame is inferred with the most accurate model
+    whose every-frame level was measured within budget, and at least one complexity
+    above the current level's; the level itself is not switched. The models of all
+    levels are created up front; a level whose model cannot be created is never used.
+    """
+    
+    LEVELS = ((2, 1), (1, 1), (0, 1), (0, 2), (0, 3))  # (model complexity, infer every n-th frame)
+    
+    def __init__(self, create_inference, target_fps=30, inferences=None, window=30):
+        self.inferences = dict(inferences or {})  # one AdaptiveInference per model complexity
+        self.budget = 1 / target_fps
+        self.window = window
+        self.level = self.LEVELS.index((1, 1))
+        self.boost = False
+        self.boost_model = None  # model complexity used while boosted, chosen when the boost starts
+        self.complexity = None   # model complexity of the last inference
+        
+        self.frame_times = deque(maxlen=window)
+        self.measured = {}     # level -> (mean processing time, frame number when measured)
+        self.frame_number = 0
+        
+        self.history = deque(maxlen=2)  # (timestamp, landmark array) of the last inferences
+        self.last_landmarks = None
+        self.inferred_frames = 0
+        self.predicted_frames = 0
+        
+        # Load every model now: creating one (which may download it) mid-session would stall the frame loop
+        for complexity in sorted({complexity for complexity, _ in self.LEVELS} - set(self.inferences)):
+            try:
+                self.inferences[complexity] = create_inference(complexity)
+            except Exception as error:
+                print(f"Pose model complexity {complexity} unavailable, its levels are skipped: {error}")
+    
+    def process(self, frame, timestamp, boost=False, needs_inference=None):
+        """Pose landmarks of a frame, inferred or predicted; boost forces inference, and so does
+        needs_inference(predicted landmarks) returning True"""
+        self.frame_number += 1
+        if boost and not self.boost:
+            self.boost_model = self.boost_complexity()
+        self.boost = boost
+        complexity, every = self.LEVELS[self.level]
+        if boost:
+            complexity = self.boost_model
+        
+        if not (boost or every == 1 or self.frame_number % every == 0 or not self.history):
+            predicted = self.predict(timestamp)
+            if needs_inference is None or not needs_inference(predicted):
+                self.predicted_frames += 1
+                return predicted
+        
+        # A model that has not run for a while starts from the full frame, not from its old crop
+        inference = self.inferences[complexity]
+        if complexity != self.complexity:
+            inference.roi = None
+            self.complexity = complexity
+        pose_landmarks = inference.process(frame).pose_landmarks
+        self.inferred_frames += 1
+        if pose_landmarks:
+            points = np.array([(p.x, p.y, p.z) for p in pose_landmarks.landmark])
+            self.history.append((timestamp, points))
+            self.last_landmarks = pose_landmarks
+        else:
+            self.history.clear()
+        return pose_landmarks
+    
+    def boost_complexity(self):
+        """Most accurate model complexity measured within budget on every frame, at least one above the current level's"""
+        current = self.LEVELS[self.level][0]
+        within_budget = [complexity for level, (complexity, every) in enumerate(self.LEVELS)
+                         if every == 1 and complexity in self.inferences
+                         and self.measured.get(level, (self.budget + 1, 0))[0] <= self.budget]
+        higher = [complexity for complexity in self.inferences if complexity > current]
+        return max(within_budget + [min(higher, default=current)])
+    
+    def predict(self, timestamp):
+        """Landmarks extrapolated from the motion between the last two inferences, at most one inference interval ahead"""
+        if len(self.history) < 2:
+            return self.last_landmarks
+        (t0, p0), (t1, p1) = self.history
+        step = min(1.0, (timestamp - t1) / (t1 - t0)) if t1 > t0 else 0.0
+        predicted = copy.deepcopy(self.last_landmarks)
+        for landmark, (x, y, z) in zip(predicted.landmark, p1 + (p1 - p0) * step):
+            landmark.x, landmark.y, landmark.z = x, y, z
+        return predicted
+    
+    def observe(self, seconds):
+        """Record a frame's processing time and adjust the level from the last window of frames"""
+        # Boosted frames are all inferred and say nothing about the current level
+        if self.boost:
+            return
+        self.frame_times.append(seconds)
+        if len(self.frame_times) < self.window:
+            return
+        
+        mean = statistics.fmean(self.frame_times)
+        self.measured[self.level] = (mean, self.frame_number)
+        if mean > self.budget and self.level < len(self.LEVELS) - 1:
+            self.set_level(self.level + 1)
+        elif self.level > 0:
+            # A level measured over budget in the last 10 windows is not retried yet
+            cost, measured_at = self.measured.get(self.level - 1, (None, 0))
+            if cost is None or self.frame_number - measured_at > 10 * self.window:
+                if mean < 0.5 * self.budget:
+                    self.set_level(self.level - 1)
+            elif cost < 0.9 * self.budget:
+                self.set_level(self.level - 1)
+    
+    def set_level(self, level):
+        """Switch level and start measuring it from scratch; a level without a model is not switched to"""
+        if self.LEVELS[level][0] not in self.inferences:
+            return
+        self.level = level
+        self.frame_times.clear()
+        complexity, every = self.LEVELS[level]
+        print(f"Pose model complexity {complexity}, inference on every {every} frame(s)")
+    
+    def describe(self):
+        """Short description of the current level for the overlay"""
+        complexity, every = self.LEVELS[self.level]
+        if self.boost:
+            return f"Model {self.boost_model} boost"
+        return f"Model {complexity}" + (f" 1/{every}" if every > 1 else "")
+    
+    def close(self):
+        """Release the models of all complexities"""
+        for inference in self.inferences.values():
+            inference.solution.close()
 
 class HighKickTracker:
-    def __init__(self):
+    TITLE = 'High Kick Tracker'
+    RECORDING = ('pose', 1, 33)  # Recorded landmarks: one pose of 33 points
+    
+    def __init__(self, inference_max_side=640, use_roi=True, standalone=True, target_fps=0):
         # Initialize MediaPipe Pose
         self.mp_pose = mp.solutions.pose
-        self.pose = self.mp_pose.Pose(
-            static_image_mode=False,
-            model_complexity=1,
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
         self.mp_drawing = mp.solutions.drawing_utils
         self.mp_drawing_styles = mp.solutions.drawing_styles
+        self.pose = None
+        self.inference = None
+        self.fidelity = None
+        self.inference_max_side = inference_max_side
+        self.use_roi = use_roi
+        
+        # Time spent in each stage of the frame loop, and whether the live overlay shows it ('p' toggles)
+        self.stages = StageTimer()
+        self.show_perf = False
+        
+        # Without standalone, landmarks come from a shared engine (see multitracker) and no model is loaded
+        if standalone:
+            self.inference = self.create_inference(1)
+            self.pose = self.inference.solution
+            
+            # With a target frame rate, the model complexity and inference rate adapt to hold it
+            if target_fps:
+                self.fidelity = AdaptiveFidelity(self.create_inference, target_fps, {1: self.inference})
+        
+        # Kick history overlay, pre-rendered whenever the highest kicks change
+        self.hud = HudLayer()
         
         # Kick tracking variables
         self.highest_kicks = []
         self.MAX_KICKS = 10
         self.exit_prompt_shown = False
         self.baseline_height = None
-        self.baseline_frames = 0
-        self.BASELINE_FRAMES_REQUIRED = 30
+        self.baseline_start_time = None
+        self.BASELINE_TIME_REQUIRED_MS = 1000.0
         self.kick_detected = False
         self.current_kick_height = 0
-        self.kick_cooldown = 0
-        self.KICK_COOLDOWN_FRAMES = 15
+        self.kick_cooldown_until = None
+        self.KICK_COOLDOWN_MS = 500.0
+        self.KICK_THRESHOLD_PERCENT = 15.0  # Height above the baseline that counts as a kick
         
-    def process_frame(self, frame):
-        # Convert BGR to RGB
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        h, w, _ = frame.shape
+        # Every completed kick in order (start, end and peak height), for offline reports
+        self.kicks = []
+        self.kick_start_time = None
+        
+        # Time of the frame being processed: its monotonic capture or video timestamp, in seconds.
+        # The baseline and cooldown windows use it, so dropped or skipped frames do not shorten them.
+        self.frame_time = None
+        
+        # Capture-to-display latency of recent frames (seconds) and stale camera frames dropped
+        self.frame_latencies = deque(maxlen=120)
+        self.dropped_frames = 0
+        
+        # LandmarkRecorder while a session is being recorded for replay
+        self.recorder = None
+        
+        # Queue for attempt and kick events when tracking runs in a worker process (see tracking_worker)
+        self.events = None
+    
+    def emit(self, event, **fields):
+        """Publish an event on the events queue, when tracking runs in a worker process"""
+        if self.events is not None:
+            self.events.put(dict(fields, event=event))
+    
+    @staticmethod
+    def print_event(event):
+        """Show an event published by the tracking worker"""
+        if event["event"] == "kick_recorded":
+            print(f"Kick {event['kick']}: {event['height_percent']:.1f}%")
+    
+    def create_inference(self, model_complexity):
+        """MediaPipe Pose with the given model complexity, wrapped in an AdaptiveInference"""
+        pose = self.mp_pose.Pose(
+            static_image_mode=False,
+            model_complexity=model_complexity,
+            min_detection_confidence=0.5,
+            min_tracking_confidence=0.5
+        )
+        
+        # Pose detection runs on a downscaled frame, or on a crop around the body once it is found
+        return AdaptiveInference(pose, lambda results: [results.pose_landmarks] if results.pose_landmarks else [],
+                                 max_side=self.inference_max_side, use_roi=self.use_roi, margin=0.4,
+                                 stages=self.stages)
+    
+    def process_frame(self, frame, timestamp=None, draw=True):
+        # Detect the body pose on a downscaled frame or a crop around the body; landmarks come back in full-frame coordinates
+        if self.fidelity is not None:
+            # Model and inference rate follow the frame budget; a kick in progress gets every frame,
+            # and a predicted pose that would start a kick or raise its peak is inferred instead
+            timestamp = time.perf_counter() if timestamp is None else timestamp
+            pose_landmarks = self.fidelity.process(frame, timestamp, boost=self.kick_detected,
+                                                   needs_inference=self.counts_toward_kick)
+        else:
+            pose_landmarks = self.inference.process(frame).pose_landmarks
+        self.analyze_frame(frame, pose_landmarks, timestamp, draw)
         
-        # Process the frame and detect body pose
-        results = self.pose.process(rgb_frame)
+        # Keep the landmarks for replaying the session without inference
+        if self.recorder is not None:
+            self.recorder.add(self.frame_time, frame, [pose_landmarks] if pose_landmarks else None)
         
-        if results.pose_landmarks:
+        return frame
+    
+    def analyze_frame(self, frame, pose_landmarks, timestamp=None, draw=True):
+        """Update the kick tracking from one frame's pose landmarks; draw=False leaves the frame untouched"""
+        # Kicks are timestamped by frame timestamps (the monotonic clock when none is given)
+        self.frame_time = time.perf_counter() if timestamp is None else timestamp
+        
+        h, w, _ = frame.shape
+        
+        if pose_landmarks:
             # Draw pose landmarks
-            self.mp_drawing.draw_landmarks(
-                frame,
-                results.pose_landmarks,
-                self.mp_pose.POSE_CONNECTIONS,
-                landmark_drawing_spec=self.mp_drawing_styles.get_default_pose_landmarks_style()
-            )
+            if draw:
+                start = time.perf_counter()
+                self.mp_drawing.draw_landmarks(
+                    frame,
+                    pose_landmarks,
+                    self.mp_pose.POSE_CONNECTIONS,
+                    landmark_drawing_spec=self.mp_drawing_styles.get_default_pose_landmarks_style()
+                )
+                self.stages.add('landmarks', time.perf_counter() - start)
             
-            # Get feet landmarks
-            left_ankle = results.pose_landmarks.landmark[self.mp_pose.PoseLandmark.LEFT_ANKLE]
-            right_ankle = results.pose_landmarks.landmark[self.mp_pose.PoseLandmark.RIGHT_ANKLE]
-            left_foot_index = results.pose_landmarks.landmark[self.mp_pose.PoseLandmark.LEFT_FOOT_INDEX]
-            right_foot_index = results.pose_landmarks.landmark[self.mp_pose.PoseLandmark.RIGHT_FOOT_INDEX]
-            
-            # Calculate foot heights (lower y value means higher in the frame)
-            left_foot_height = min(left_ankle.y, left_foot_index.y)
-            right_foot_height = min(right_ankle.y, right_foot_index.y)
+            left_foot_height, right_foot_height = self.foot_heights(pose_landmarks)
             
             # Get the height of the highest foot (in screen coordinates)
             current_highest_point = min(left_foot_height, right_foot_height)
             
-            # Establish baseline height (ground level) in the first few frames
-            if self.baseline_height is None or self.baseline_frames < self.BASELINE_FRAMES_REQUIRED:
+            # Establish baseline height (ground level) during the first BASELINE_TIME_REQUIRED_MS with a pose
+            if self.baseline_start_time is None:
+                self.baseline_start_time = self.frame_time
+            if not self.baseline_established():
                 # During baseline detection, take the lowest foot position (highest y)
                 if self.baseline_height is None:
                     self.baseline_height = max(left_foot_height, right_foot_height)
                 else:
                     # Update baseline to be the lowest position seen
                     self.baseline_height = max(self.baseline_height, max(left_foot_height, right_foot_height))
-                self.baseline_frames += 1
                 
                 # Draw baseline detection text
-                baseline_text = f"Establishing baseline: {self.baseline_frames}/{self.BASELINE_FRAMES_REQUIRED}"
-                cv2.putText(frame, baseline_text, (20, 60), 
-                            cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 255), 2)
+                if draw:
+                    baseline_text = (f"Establishing baseline: {self.frame_time - self.baseline_start_time:.1f}/"
+                                     f"{self.BASELINE_TIME_REQUIRED_MS / 1000:.1f} s")
+                    cv2.putText(frame, baseline_text, (20, 60), 
+                                cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 255), 2)
             else:
                 # Calculate kick height as a percentage of screen height
                 # Baseline is 0%, top of screen would be 100%
                 kick_height_percent = ((self.baseline_height - current_highest_point) / self.baseline_height) * 100
                 
-                # Handle kick detection and tracking
-                if self.kick_cooldown > 0:
-                    self.kick_cooldown -= 1
-                
                 # Detect if currently in a kick motion
-                if kick_height_percent > 15:  # Threshold for kick detection
+                if kick_height_percent > self.KICK_THRESHOLD_PERCENT:  # Threshold for kick detection
                     # Track the highest point of the current kick
                     if not self.kick_detected:
                         self.kick_detected = True
+                        self.kick_start_time = self.frame_time
                         self.current_kick_height = kick_height_percent
                     else:
                         self.current_kick_height = max(self.current_kick_height, kick_height_percent)
                     
                     # Draw current kick height
-                    kick_text = f"Current: {self.current_kick_height:.1f}%"
-                    cv2.putText(frame, kick_text, (20, 100), 
-                                cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-                elif self.kick_detected and self.kick_cooldown == 0:
+                    if draw:
+                        kick_text = f"Current: {self.current_kick_height:.1f}%"
+                        cv2.putText(frame, kick_text, (20, 100), 
+                                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+                elif self.kick_detected and (self.kick_cooldown_until is None
+                                             or self.frame_time >= self.kick_cooldown_until):
                     # End of kick detected
-                    if self.current_kick_height > 15:  # Minimum threshold to count as a kick
+                    if self.current_kick_height > self.KICK_THRESHOLD_PERCENT:  # Minimum threshold to count as a kick
+                        self.kicks.append({"kick": len(self.kicks) + 1, "start_sec": self.kick_start_time,
+                                           "end_sec": self.frame_time, "height_percent": self.current_kick_height})
+                        self.emit("kick_recorded", **self.kicks[-1])
                         self.highest_kicks.append(self.current_kick_height)
                         # Sort kicks in descending order and keep only the top MAX_KICKS
                         self.highest_kicks = sorted(self.highest_kicks, reverse=True)[:self.MAX_KICKS]
                     
                     self.kick_detected = False
                     self.current_kick_height = 0
-                    self.kick_cooldown = self.KICK_COOLDOWN_FRAMES
+                    self.kick_cooldown_until = self.frame_time + self.KICK_COOLDOWN_MS / 1000
             
             # Visualize the baseline
-            baseline_y = int(self.baseline_height * h)
-            cv2.line(frame, (0, baseline_y), (w, baseline_y), (0, 0, 255), 2)
-            
-            # Draw visual indicator of current foot height
-            if self.baseline_height is not None:
+            if draw:
+                baseline_y = int(self.baseline_height * h)
+                cv2.line(frame, (0, baseline_y), (w, baseline_y), (0, 0, 255), 2)
+                
+                # Draw visual indicator of current foot height
                 foot_y = int(current_highest_point * h)
                 cv2.circle(frame, (w - 50, foot_y), 10, (0, 255, 0), -1)
                 cv2.line(frame, (w - 50, baseline_y), (w - 50, foot_y), (0, 255, 0), 2)
         
-        # Display kick history
-        self.display_kick_history(frame)
+        # Display kick history from the cached sprite
+        start = time.perf_counter()
+        if draw:
+            self.hud.draw(frame, tuple(self.highest_kicks), self.display_kick_history)
         
         # Show exit prompt after MAX_KICKS
         if len(self.highest_kicks) >= self.MAX_KICKS and not self.exit_prompt_shown:
-            self.display_exit_prompt(frame)
+            if draw:
+                self.display_exit_prompt(frame)
             self.exit_prompt_shown = True
+        self.stages.add('overlay', time.perf_counter() - start)
         
         return frame
     
+    def foot_heights(self, pose_landmarks):
+        """Heights of the left and right foot (lower y value means higher in the frame)"""
+        landmark = pose_landmarks.landmark
+        left_ankle = landmark[self.mp_pose.PoseLandmark.LEFT_ANKLE]
+        right_ankle = landmark[self.mp_pose.PoseLandmark.RIGHT_ANKLE]
+        left_foot_index = landmark[self.mp_pose.PoseLandmark.LEFT_FOOT_INDEX]
+        right_foot_index = landmark[self.mp_pose.PoseLandmark.RIGHT_FOOT_INDEX]
+        return min(left_ankle.y, left_foot_index.y), min(right_ankle.y, right_foot_index.y)
+    
+    def counts_toward_kick(self, pose_landmarks):
+        """True if these landmarks would start a kick or raise the current kick's peak"""
+        if not pose_landmarks or not self.baseline_established():
+            return False
+        kick_height_percent = (self.baseline_height - min(self.foot_heights(pose_landmarks))) / self.baseline_height * 100
+        return kick_height_percent > max(self.KICK_THRESHOLD_PERCENT, self.current_kick_height)
+    
+    def baseline_established(self):
+        """True once the standing baseline has been observed for BASELINE_TIME_REQUIRED_MS"""
+        return (self.baseline_height is not None
+                and self.frame_time - self.baseline_start_time >= self.BASELINE_TIME_REQUIRED_MS / 1000)
+    
     def display_kick_history(self, frame):
         """Display list of highest kicks on right side of frame"""
         h, w, _ = frame.shape
@@ -159,14 +417,37 @@ class HighKickTracker:
             cv2.putText(frame, attempts_text, (20, h - 20), 
                         cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
     
+    def add_latency_info(self, frame):
+        """Show the measured capture-to-display latency and the number of dropped frames"""
+        if not self.frame_latencies:
+            return
+        h, w, _ = frame.shape
+        
+        latency_ms = 1000 * sum(self.frame_latencies) / len(self.frame_latencies)
+        latency_text = f"Latency: {latency_ms:.0f} ms  Dropped: {self.dropped_frames}"
+        cv2.putText(frame, latency_text, (w - 330, h - 20), 
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (200, 200, 200), 1)
+        if self.fidelity is not None:
+            cv2.putText(frame, self.fidelity.describe(), (w - 330, h - 45), 
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (200, 200, 200), 1)
+    
+    def latency_stats(self):
+        """Mean, 95th percentile and maximum latency in ms over recent frames, and dropped frames"""
+        stats = {"dropped_frames": self.dropped_frames}
+        if self.frame_latencies:
+            latencies = sorted(1000 * latency for latency in self.frame_latencies)
+            stats["mean_ms"] = sum(latencies) / len(latencies)
+            stats["p95_ms"] = latencies[int(0.95 * (len(latencies) - 1))]
+            stats["max_ms"] = latencies[-1]
+        return stats
+    
     def display_exit_prompt(self, frame):
         """Display exit prompt after maximum kicks recorded"""
         h, w, _ = frame.shape
         
-        # Create semi-transparent overlay
-        overlay = frame.copy()
-        cv2.rectangle(overlay, (int(w/4), int(h/3)), (int(3*w/4), int(2*h/3)), (0, 0, 0), -1)
-        cv2.addWeighted(overlay, 0.7, frame, 0.3, 0, frame)
+        # Darken the prompt box (a 70% black overlay) without copying the whole frame
+        box = frame[int(h/3):int(2*h/3) + 1, int(w/4):int(3*w/4) + 1]
+        box[:] = cv2.convertScaleAbs(box, alpha=0.3)
         
         # Display prompt text
         prompt_text1 = "10 highest kicks recorded!"
@@ -186,41 +467,219 @@ class HighKickTracker:
         cv2.putText(frame, prompt_text2, (text_x2, text_y2), 
                     cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 255), 2)
     
-    def run(self):
+    def finish_frame(self, timestamp):
+        """Close the stage timings of a frame once it has been shown; the adaptive fidelity learns from them"""
+        self.stages.end_frame(timestamp)
+        if self.fidelity is not None:
+            self.fidelity.observe(self.stages.busy_time())
+    
+    def close(self):
+        """Release the pose models"""
+        if self.fidelity is not None:
+            self.fidelity.close()
+        elif self.pose is not None:
+            self.pose.close()
+    
+    def run(self, record_path=None, perf_csv=None):
         """Main method to run the high kick tracker"""
-        # Initialize webcam
-        cap = cv2.VideoCapture(0)
+        # Initialize webcam; frames are captured on a background thread that keeps only the newest
+        capture = LatestFrameCapture(0)
+        if record_path:
+            self.recorder = LandmarkRecorder(*self.RECORDING)
         
         # Set fullscreen window
         cv2.namedWindow('High Kick Tracker', cv2.WND_PROP_FULLSCREEN)
         cv2.setWindowProperty('High Kick Tracker', cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
         
-        while cap.isOpened():
-            ret, frame = cap.read()
+        self.stages.start()
+        while capture.is_opened():
+            start = time.perf_counter()
+            ret, frame, captured_at = capture.read()
+            self.stages.add('capture', time.perf_counter() - start)
             if not ret:
                 print("Failed to grab frame")
                 break
             
             # Process the frame
-            processed_frame = self.process_frame(frame)
+            processed_frame = self.process_frame(frame, captured_at)
             
             # Display the frame
+            self.add_latency_info(processed_frame)
+            if self.show_perf:
+                self.stages.draw(processed_frame)
+            start = time.perf_counter()
             cv2.imshow('High Kick Tracker', processed_frame)
+            key = cv2.waitKey(1) & 0xFF
+            self.stages.add('display', time.perf_counter() - start)
+            self.finish_frame(captured_at)
             
-            # Exit on 'q' key press
-            if cv2.waitKey(1) & 0xFF == ord('q'):
+            # The frame is on screen once waitKey returns
+            self.frame_latencies.append(time.perf_counter() - captured_at)
+            self.dropped_frames = capture.dropped_frames
+            
+            # Exit on 'q' key press, show or hide the stage timings on 'p'
+            if key == ord('q'):
                 break
+            if key == ord('p'):
+                self.show_perf = not self.show_perf
         
         # Clean up
-        cap.release()
+        capture.release()
         cv2.destroyAllWindows()
-        self.pose.close()
+        self.close()
+        if self.recorder is not None:
+            self.recorder.save(record_path)
+        
+        stats = self.latency_stats()
+        if "mean_ms" in stats:
+            print(f"Latency (capture to display): mean {stats['mean_ms']:.0f} ms, "
+                  f"p95 {stats['p95_ms']:.0f} ms; {stats['dropped_frames']} stale frames dropped")
+        if self.fidelity is not None:
+            print(f"Pose inferred on {self.fidelity.inferred_frames} frames, "
+                  f"predicted on {self.fidelity.predicted_frames}")
+        self.stages.print_summary()
+        if perf_csv:
+            self.stages.write_csv(perf_csv)
+    
+    def process_video(self, video_path, annotated_path=None, record_path=None, draw=None):
+        """Measure the kicks in a recorded video as fast as possible, without a window.
+        
+        Landmarks and HUD are drawn when draw is set, by default only for an annotated video.
+        Drawn frames that are not written are JPEG-encoded in memory instead, as a stand-in
+        for displaying them, so benchmarks time the same stages as the live loop.
+        """
+        draw = bool(annotated_path) if draw is None else draw
+        cap = cv2.VideoCapture(str(video_path))
+        if not cap.isOpened():
+            raise ValueError(f"Cannot open video '{video_path}'")
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        if record_path:
+            self.recorder = LandmarkRecorder(*self.RECORDING)
+        
+        writer = None
+        frame_count = 0
+        self.stages.start()
+        while True:
+            start = time.perf_counter()
+            ret, frame = cap.read()
+            self.stages.add('capture', time.perf_counter() - start)
+            if not ret:
+                break
+            
+            # Every frame is processed; its time comes from the frame rate, not the clock
+            timestamp = frame_count / fps
+            processed_frame = self.process_frame(frame, timestamp, draw)
+            frame_count += 1
+            
+            # Optionally write the annotated frame, or encode the drawn one in place of showing it
+            start = time.perf_counter()
+            if annotated_path:
+                if writer is None:
+                    h, w, _ = processed_frame.shape
+                    writer = cv2.VideoWriter(str(annotated_path), cv2.VideoWriter_fourcc(*'mp4v'), fps, (w, h))
+                writer.write(processed_frame)
+                self.stages.add('display', time.perf_counter() - start)
+            elif draw:
+                cv2.imencode('.jpg', processed_frame)
+                self.stages.add('display', time.perf_counter() - start)
+            self.finish_frame(timestamp)
+        
+        # Clean up
+        cap.release()
+        if writer is not None:
+            writer.release()
+        self.close()
+        if self.recorder is not None:
+            self.recorder.save(record_path)
+        
+        return {
+            "video": str(video_path),
+            "frames": frame_count,
+            "fps": fps,
+            "duration_sec": frame_count / fps,
+            "stages": self.stages.summary(),
+            "baseline_height": self.baseline_height,
+            "highest_kicks": self.highest_kicks,
+            "kicks": self.kicks,
+        }
 
-if __name__ == "__main__":
-    print("Starting High Kick Tracker...")
-    print("Please stand in your normal position for a few seconds to establish baseline.")
-    print("The program will track your 10 highest kicks.")
-    print("Press 'q' to quit.")
+def write_results(results, json_path=None, csv_path=None):
+    """Write the kicks of every video as JSON and/or as CSV with one row per kick"""
+    if json_path:
+        with open(json_path, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {json_path}")
     
-    tracker = HighKickTracker()
-    tracker.run()
\ No newline at end of file
+    if csv_path:
+        with open(csv_path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(["video", "kick", "start_sec", "end_sec", "height_percent"])
+            for result in results:
+                for kick in result.get("kicks", []):
+                    writer.writerow([result["video"], kick["kick"], f"{kick['start_sec']:.3f}",
+                                     f"{kick['end_sec']:.3f}", f"{kick['height_percent']:.1f}"])
+        print(f"Results written to {csv_path}")
+
+def main():
+    """Run the live tracker, or analyze recorded videos when video files are given"""
+    parser = argparse.ArgumentParser(description='Track kick heights from the webcam or from recorded videos.')
+    parser.add_argument('videos', nargs='*', help='Recorded videos to analyze headless (default: live webcam)')
+    parser.add_argument('--workers', '-w', type=int, default=None,
+                        help='Videos analyzed in parallel processes (default: number of CPU cores)')
+    parser.add_argument('--json', help='Write the kicks of every video to this JSON file')
+    parser.add_argument('--csv', help='Write one row per kick to this CSV file')
+    parser.add_argument('--annotate', metavar='DIR', help='Write annotated copies of the videos to this directory')
+    parser.add_argument('--inference-size', type=int, default=640,
+                        help='Longest side of the image passed to MediaPipe (0 = full resolution, default: 640)')
+    parser.add_argument('--no-roi', action='store_true',
+                        help='Always run detection on the whole frame instead of a crop around the last landmarks')
+    parser.add_argument('--target-fps', type=float, default=0,
+                        help='Live frame rate to hold by adapting the pose model and inference rate (default: off, model 1 on every frame)')
+    parser.add_argument('--split', action='store_true',
+                        help='Track in a headless worker process and show its frames from shared memory (live only)')
+    parser.add_argument('--perf', action='store_true',
+                        help='Show frame rate and per-stage timings on screen (toggle with p)')
+    parser.add_argument('--perf-csv', metavar='FILE', help='Write the stage timings of every frame to this CSV file on exit')
+    parser.add_argument('--record', metavar='DIR',
+                        help='Save the landmarks of every frame to this directory for replay.py')
+    args = parser.parse_args()
+    options = dict(inference_max_side=args.inference_size, use_roi=not args.no_roi)
+    
+    if not args.videos:
+        print("Starting High Kick Tracker...")
+        print("Please stand in your normal position for a few seconds to establish baseline.")
+        print("The program will track your 10 highest kicks.")
+        print("Press 'q' to quit.")
+        
+        record_path = None
+        if args.record:
+            os.makedirs(args.record, exist_ok=True)
+            record_path = Path(args.record) / f"live_{time.strftime('%Y%m%d_%H%M%S')}_landmarks.npz"
+        
+        if args.split:
+            run_viewer(HighKickTracker, 0, dict(options, target_fps=args.target_fps), show_perf=args.perf,
+                       record_path=record_path, perf_csv=args.perf_csv)
+            return
+        
+        tracker = HighKickTracker(target_fps=args.target_fps, **options)
+        tracker.show_perf = args.perf
+        tracker.run(record_path, args.perf_csv)
+        return
+    
+    start = time.perf_counter()
+    results = process_videos(HighKickTracker, args.videos, args.workers, args.annotate, options, args.record)
+    elapsed = time.perf_counter() - start
+    
+    for result in results:
+        if "error" in result:
+            print(f"{result['video']}: error: {result['error']}")
+            continue
+        heights = ", ".join(f"{kick['height_percent']:.1f}%" for kick in result["kicks"]) or "none"
+        print(f"{result['video']}: {len(result['kicks'])} kicks ({heights})")
+    frames = sum(result.get("frames", 0) for result in results)
+    print(f"Processed {frames} frames in {elapsed:.1f}s ({frames / max(elapsed, 1e-9):.0f} frames/sec)")
+    
+    write_results(results, args.json, args.csv)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,65 @@
+import argparse
+import json
+import numpy as np
+
+from highkick import HighKickTracker
+from tracking import Recording, find_recordings, parse_sweep, sweep
+
+def replay(recording, params=None):
+    """Feed a recording through HighKickTracker's detection logic with some constants changed; returns the kicks"""
+    tracker = HighKickTracker(standalone=False)
+    for name, value in (params or {}).items():
+        setattr(tracker, name, value)
+    
+    # Nothing is drawn, so only the frame's size is used
+    frame = np.empty((*recording.frame_size, 3), dtype=np.uint8)
+    for timestamp, landmark_lists in recording.frames:
+        tracker.analyze_frame(frame, landmark_lists[0] if landmark_lists else None, timestamp, draw=False)
+    return tracker.kicks
+
+def summarize(kicks):
+    """Number, highest and mean height of the kicks found in all recordings"""
+    heights = [kick["height_percent"] for found in kicks.values() for kick in found]
+    return {
+        "kicks": len(heights),
+        "highest_percent": max(heights) if heights else None,
+        "mean_percent": sum(heights) / len(heights) if heights else None,
+    }
+
+def main():
+    """Replay landmark recordings through the kick logic, optionally sweeping its constants"""
+    parser = argparse.ArgumentParser(description='Replay recorded pose landmarks to tune the High Kick Tracker.')
+    parser.add_argument('recordings', nargs='+', help='Landmark recordings (.npz) or directories of them')
+    parser.add_argument('--sweep', action='append', default=[], metavar='NAME=V1,V2,...',
+                        help='Constant to sweep, e.g. KICK_THRESHOLD_PERCENT=10,15,20 (repeatable)')
+    parser.add_argument('--json', help='Write every combination with its kicks to this JSON file')
+    args = parser.parse_args()
+    
+    try:
+        grid = parse_sweep(HighKickTracker, args.sweep)
+    except ValueError as e:
+        parser.error(str(e))
+    
+    recordings = [Recording(path, 'pose') for path in find_recordings(args.recordings)]
+    if not recordings:
+        parser.error("No recordings found")
+    frames = sum(len(recording.frames) for recording in recordings)
+    print(f"Replaying {len(recordings)} recordings ({frames} frames)")
+    
+    rows = sweep(recordings, grid, replay, summarize)
+    
+    header = "".join(f"{name:>26}" for name in grid) + f"{'Kicks':>8}{'Highest %':>11}{'Mean %':>9}{'frames/s':>11}"
+    print(header)
+    for row in rows:
+        highest = f"{row['highest_percent']:.1f}" if row["highest_percent"] is not None else "-"
+        mean = f"{row['mean_percent']:.1f}" if row["mean_percent"] is not None else "-"
+        print("".join(f"{value:>26}" for value in row["params"].values())
+              + f"{row['kicks']:>8}{highest:>11}{mean:>9}{row['frames_per_sec']:>11.0f}")
+    
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(rows, f, indent=2)
+        print(f"Results written to {args.json}")
+
+if __name__ == "__main__":
+    main()
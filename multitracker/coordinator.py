@@ -0,0 +1,243 @@
+import argparse
+import json
+import os
+import queue
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from multiprocessing import Manager
+from pathlib import Path
+import cv2
+import numpy as np
+
+# The trackers live in the single-exercise projects next to this one
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(REPO_DIR / 'handstandtimer'), str(REPO_DIR / 'highkick'), str(REPO_DIR / 'common')]
+
+from handstandtimer import HandstandTimer
+from highkick import HighKickTracker
+from tracking import LatestFrameCapture
+
+TRACKERS = {'handstand': HandstandTimer, 'kick': HighKickTracker}
+
+def parse_station(spec, index):
+    """Parse EXERCISE:SOURCE[@ATHLETE]; SOURCE is a camera index or a video file"""
+    exercise, _, source = spec.partition(':')
+    if exercise not in TRACKERS or not source:
+        raise argparse.ArgumentTypeError(f"Station '{spec}' is not EXERCISE:SOURCE[@ATHLETE] "
+                                         f"with EXERCISE one of {', '.join(TRACKERS)}")
+    source, _, athlete = source.partition('@')
+    if source.isdigit():
+        source = int(source)
+        athlete = athlete or f"Station {index + 1}"
+    else:
+        athlete = athlete or Path(source).stem
+    return {"station": index + 1, "exercise": exercise, "source": source, "athlete": athlete}
+
+def station_cores(count):
+    """Core for each station, or None where the platform cannot pin processes"""
+    if not hasattr(os, 'sched_setaffinity'):
+        return [None] * count
+    cores = sorted(os.sched_getaffinity(0))
+    # Leave the first core to the coordinator and its leaderboard when there are enough
+    if len(cores) > count:
+        cores = cores[1:]
+    return [cores[i % len(cores)] for i in range(count)]
+
+def run_station(station, core, events, stop, show=True, options=None):
+    """Run one tracker on one camera or video in a worker process and report every result as it happens"""
+    # Pin the worker to its core; OpenCV's own thread pool would otherwise spread it over all cores
+    if core is not None:
+        os.sched_setaffinity(0, {core})
+        cv2.setNumThreads(1)
+    
+    tracker = TRACKERS[station["exercise"]](**(options or {}))
+    results = tracker.attempts if station["exercise"] == 'handstand' else tracker.kicks
+    window = f"{station['athlete']} - {station['exercise']}"
+    
+    # Cameras give live frames; videos are read frame by frame and timed from their frame rate
+    live = isinstance(station["source"], int)
+    if live:
+        capture = LatestFrameCapture(station["source"])
+    else:
+        capture = cv2.VideoCapture(station["source"])
+        fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+    opened = capture.is_opened() if live else capture.isOpened()
+    if not opened:
+        raise ValueError(f"Cannot open source '{station['source']}'")
+    
+    frame_count = 0
+    reported = 0
+    start = time.perf_counter()
+    while not stop.is_set():
+        if live:
+            ret, frame, timestamp = capture.read()
+        else:
+            ret, frame = capture.read()
+            timestamp = frame_count / fps
+        if not ret:
+            break
+        frame_count += 1
+        
+        processed_frame = tracker.process_frame(frame, timestamp)
+        
+        # Report results finished in this frame to the leaderboard
+        for result in results[reported:]:
+            events.put(dict(station, source=str(station["source"]), result=result))
+        reported = len(results)
+        
+        if show:
+            cv2.imshow(window, processed_frame)
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                break
+    
+    # An attempt still running when the stream ends counts as finished
+    if station["exercise"] == 'handstand':
+        tracker.stop_timing()
+        for result in results[reported:]:
+            events.put(dict(station, source=str(station["source"]), result=result))
+    
+    capture.release()
+    if show:
+        cv2.destroyWindow(window)
+    
+    elapsed = time.perf_counter() - start
+    return dict(station, source=str(station["source"]), core=core, frames=frame_count,
+                frames_per_sec=frame_count / elapsed if elapsed > 0 else 0.0,
+                results=results)
+
+class Leaderboard:
+    """Best handstand per athlete and highest kicks across all stations"""
+    
+    def __init__(self, size=10):
+        self.size = size
+        self.handstands = {}  # athlete -> best handstand in seconds
+        self.kicks = []       # (height percent, athlete) of the highest kicks
+    
+    def add(self, event):
+        """Record one finished attempt or kick reported by a station"""
+        athlete = event["athlete"]
+        if event["exercise"] == 'handstand':
+            duration = event["result"]["duration_sec"]
+            self.handstands[athlete] = max(self.handstands.get(athlete, 0.0), duration)
+        else:
+            self.kicks.append((event["result"]["height_percent"], athlete))
+            self.kicks = sorted(self.kicks, reverse=True)[:self.size]
+    
+    def lines(self):
+        """Leaderboard as text lines"""
+        lines = ["Best handstands:"]
+        ranked = sorted(self.handstands.items(), key=lambda item: item[1], reverse=True)[:self.size]
+        lines += [f"  {i}. {athlete}: {best:.2f} s" for i, (athlete, best) in enumerate(ranked, 1)] or ["  -"]
+        lines.append("Highest kicks:")
+        lines += [f"  {i}. {athlete}: {height:.1f}%" for i, (height, athlete) in enumerate(self.kicks, 1)] or ["  -"]
+        return lines
+    
+    def render(self):
+        """Leaderboard as an image for its own window"""
+        lines = self.lines()
+        image = np.zeros((40 + 35 * len(lines), 520, 3), dtype=np.uint8)
+        for i, line in enumerate(lines):
+            color = (0, 255, 255) if line.endswith(':') else (255, 255, 255)
+            cv2.putText(image, line, (20, 40 + 35 * i), cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2)
+        return image
+    
+    def to_dict(self):
+        """JSON-serializable leaderboard"""
+        ranked = sorted(self.handstands.items(), key=lambda item: item[1], reverse=True)[:self.size]
+        return {
+            "handstands": [{"athlete": athlete, "best_sec": best} for athlete, best in ranked],
+            "kicks": [{"athlete": athlete, "height_percent": height} for height, athlete in self.kicks],
+        }
+
+def coordinate(stations, show=True, options=None):
+    """Run every station in its own pinned worker process and keep the combined leaderboard"""
+    leaderboard = Leaderboard()
+    stations = list(stations)
+    cores = station_cores(len(stations))
+    
+    with Manager() as manager, ProcessPoolExecutor(max_workers=len(stations)) as executor:
+        events = manager.Queue()
+        stop = manager.Event()
+        futures = [executor.submit(run_station, station, core, events, stop, show, options)
+                   for station, core in zip(stations, cores)]
+        pending = set(futures)
+        for station, core in zip(stations, cores):
+            print(f"Station {station['station']}: {station['exercise']} for {station['athlete']} "
+                  f"from {station['source']}" + (f" on core {core}" if core is not None else ""))
+        
+        try:
+            while pending:
+                done, pending = wait(pending, timeout=0.05, return_when=FIRST_COMPLETED)
+                for future in done:
+                    # Surface a failed station right away instead of after all others finish
+                    future.result()
+                
+                # Apply every result reported since the last pass
+                changed = False
+                while True:
+                    try:
+                        event = events.get_nowait()
+                    except queue.Empty:
+                        break
+                    leaderboard.add(event)
+                    changed = True
+                    if event["exercise"] == 'handstand':
+                        print(f"{event['athlete']}: handstand {event['result']['duration_sec']:.2f}s")
+                    else:
+                        print(f"{event['athlete']}: kick {event['result']['height_percent']:.1f}%")
+                
+                if show:
+                    if changed or not pending:
+                        cv2.imshow('Leaderboard', leaderboard.render())
+                    if cv2.waitKey(1) & 0xFF == ord('q'):
+                        stop.set()
+        finally:
+            # Live stations only end on stop; without it a failed station or Ctrl+C would leave
+            # the pool waiting for them forever
+            stop.set()
+        
+        # Each station's results stay separate; only the leaderboard combines them
+        results = [future.result() for future in futures]
+    
+    if show:
+        cv2.destroyAllWindows()
+    return results, leaderboard
+
+def main():
+    """Run several tracking stations at once with a combined leaderboard"""
+    parser = argparse.ArgumentParser(description='Run one tracker per camera or video with a combined leaderboard.')
+    parser.add_argument('stations', nargs='+', type=str,
+                        help='Stations as EXERCISE:SOURCE[@ATHLETE], e.g. handstand:0@Ana kick:clips/ben.mp4@Ben')
+    parser.add_argument('--headless', action='store_true', help='No windows; results are printed only')
+    parser.add_argument('--json', help='Write the per-station results and the leaderboard to this JSON file')
+    parser.add_argument('--inference-size', type=int, default=640,
+                        help='Longest side of the image passed to MediaPipe (0 = full resolution, default: 640)')
+    parser.add_argument('--no-roi', action='store_true',
+                        help='Always run detection on the whole frame instead of a crop around the last landmarks')
+    args = parser.parse_args()
+    
+    try:
+        stations = [parse_station(spec, i) for i, spec in enumerate(args.stations)]
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+    options = dict(inference_max_side=args.inference_size, use_roi=not args.no_roi)
+    
+    start = time.perf_counter()
+    results, leaderboard = coordinate(stations, show=not args.headless, options=options)
+    elapsed = time.perf_counter() - start
+    
+    print(f"\nAll stations finished in {elapsed:.1f}s")
+    for result in results:
+        print(f"Station {result['station']} ({result['athlete']}, {result['exercise']}): "
+              f"{len(result['results'])} results, {result['frames']} frames at {result['frames_per_sec']:.0f} frames/sec")
+    print()
+    print("\n".join(leaderboard.lines()))
+    
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({"stations": results, "leaderboard": leaderboard.to_dict()}, f, indent=2)
+        print(f"Results written to {args.json}")
+
+if __name__ == "__main__":
+    main()
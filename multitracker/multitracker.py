@@ -0,0 +1,326 @@
+import argparse
+import json
+import os
+import sys
+import time
+import types
+from pathlib import Path
+import cv2
+import mediapipe as mp
+
+# The exercise logic lives in the single-exercise scripts next to this project, the capture and
+# inference helpers in the code they share
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(REPO_DIR / 'handstandtimer'), str(REPO_DIR / 'highkick'), str(REPO_DIR / 'common')]
+
+from handstandtimer import HandstandTimer
+from highkick import HighKickTracker
+from tracking import AdaptiveInference, LatestFrameCapture
+
+class FrameLandmarks:
+    """Landmarks of one frame from the shared inference, in full-frame normalized coordinates"""
+    
+    def __init__(self, pose=None, hands=()):
+        self.pose = pose          # pose landmark list (33 landmarks) or None
+        self.hands = list(hands)  # hand landmark lists, indexed by mp.solutions.hands.HandLandmark
+
+def pose_hands(pose_landmarks, min_visibility=0.5):
+    """Stand-ins for hand landmarks, built from the pose model's wrist, index and pinky points
+    
+    hands_on_ground only looks at the wrist, index finger tip and middle finger tip; the
+    pose model has no middle finger, so the pinky takes its place.
+    """
+    HandLandmark = mp.solutions.hands.HandLandmark
+    PoseLandmark = mp.solutions.pose.PoseLandmark
+    landmark = pose_landmarks.landmark
+    
+    hands = []
+    for wrist, index, pinky in ((PoseLandmark.LEFT_WRIST, PoseLandmark.LEFT_INDEX, PoseLandmark.LEFT_PINKY),
+                                (PoseLandmark.RIGHT_WRIST, PoseLandmark.RIGHT_INDEX, PoseLandmark.RIGHT_PINKY)):
+        # The pose model always places both hands; skip hands it cannot actually see
+        if min(landmark[wrist].visibility, landmark[index].visibility) < min_visibility:
+            continue
+        hands.append(types.SimpleNamespace(landmark={
+            HandLandmark.WRIST: landmark[wrist],
+            HandLandmark.INDEX_FINGER_TIP: landmark[index],
+            HandLandmark.MIDDLE_FINGER_TIP: landmark[pinky],
+        }))
+    return hands
+
+class ExerciseAnalyzer:
+    """An exercise fed by TrackingEngine; it only reads landmarks and never runs inference itself"""
+    
+    name = None
+    
+    def update(self, landmarks, frame, timestamp):
+        """Consume one frame's FrameLandmarks"""
+        raise NotImplementedError
+    
+    def finish(self):
+        """Close an attempt still in progress at the end of a video or session"""
+    
+    def status(self):
+        """One line for the combined overlay"""
+        raise NotImplementedError
+    
+    def results(self):
+        """JSON-serializable results of the session"""
+        raise NotImplementedError
+
+class HandstandAnalyzer(ExerciseAnalyzer):
+    """Handstand timing with the ground-contact logic of HandstandTimer"""
+    
+    name = 'handstand'
+    
+    def __init__(self):
+        self.timer = HandstandTimer(standalone=False)
+    
+    def update(self, landmarks, frame, timestamp):
+        self.timer.analyze_frame(frame, landmarks.hands, timestamp, draw=False)
+    
+    def finish(self):
+        self.timer.stop_timing()
+    
+    def best_time(self):
+        """Longest handstand so far in seconds, or None"""
+        return max(self.timer.timer_history) if self.timer.timer_history else None
+    
+    def status(self):
+        if self.timer.is_timing:
+            return f"Handstand: {self.timer.frame_time - self.timer.start_time:.2f} s"
+        best = self.best_time()
+        if best is None:
+            return "Handstand: ready"
+        return f"Handstand: best {best:.2f} s ({len(self.timer.timer_history)} attempts)"
+    
+    def results(self):
+        return {"best_sec": self.best_time(), "attempts": self.timer.attempts}
+
+class KickAnalyzer(ExerciseAnalyzer):
+    """Kick height tracking with the baseline and kick-peak logic of HighKickTracker"""
+    
+    name = 'kick'
+    
+    def __init__(self):
+        self.tracker = HighKickTracker(standalone=False)
+    
+    def update(self, landmarks, frame, timestamp):
+        self.tracker.analyze_frame(frame, landmarks.pose, timestamp, draw=False)
+    
+    def status(self):
+        tracker = self.tracker
+        if tracker.frame_time is None or not tracker.baseline_established():
+            return "Kick: establishing baseline"
+        if tracker.kick_detected:
+            return f"Kick: {tracker.current_kick_height:.1f}%"
+        if not tracker.highest_kicks:
+            return "Kick: ready"
+        return f"Kick: best {tracker.highest_kicks[0]:.1f}% ({len(tracker.kicks)} kicks)"
+    
+    def results(self):
+        return {"highest_kicks": self.tracker.highest_kicks, "kicks": self.tracker.kicks}
+
+# Exercises available to the engine; a new exercise only needs an ExerciseAnalyzer registered here
+ANALYZERS = {analyzer.name: analyzer for analyzer in (HandstandAnalyzer, KickAnalyzer)}
+
+class TrackingEngine:
+    """Runs one landmark inference per frame and feeds it to every exercise analyzer"""
+    
+    def __init__(self, exercises=('handstand', 'kick'), model='holistic', inference_max_side=640, use_roi=True):
+        self.analyzers = [ANALYZERS[name]() for name in exercises]
+        self.model = model
+        self.mp_drawing = mp.solutions.drawing_utils
+        
+        # Holistic finds the full hand landmarks as well; Pose alone is cheaper and approximates the hands
+        if model == 'holistic':
+            self.solution = mp.solutions.holistic.Holistic(
+                static_image_mode=False,
+                model_complexity=1,
+                min_detection_confidence=0.5,
+                min_tracking_confidence=0.5
+            )
+            landmark_lists = lambda results: [landmarks for landmarks in (
+                results.pose_landmarks, results.left_hand_landmarks, results.right_hand_landmarks,
+                results.face_landmarks) if landmarks]
+        elif model == 'pose':
+            self.solution = mp.solutions.pose.Pose(
+                static_image_mode=False,
+                model_complexity=1,
+                min_detection_confidence=0.5,
+                min_tracking_confidence=0.5
+            )
+            landmark_lists = lambda results: [results.pose_landmarks] if results.pose_landmarks else []
+        else:
+            raise ValueError(f"Unknown landmark model '{model}'")
+        
+        # The one inference per frame, on a downscaled frame or a crop around the athlete
+        self.inference = AdaptiveInference(self.solution, landmark_lists,
+                                           max_side=inference_max_side, use_roi=use_roi, margin=0.4)
+    
+    def detect(self, frame):
+        """Run the shared inference on a BGR frame and collect its landmarks"""
+        results = self.inference.process(frame)
+        if self.model == 'holistic':
+            hands = [hand for hand in (results.left_hand_landmarks, results.right_hand_landmarks) if hand]
+            return FrameLandmarks(results.pose_landmarks, hands)
+        hands = pose_hands(results.pose_landmarks) if results.pose_landmarks else []
+        return FrameLandmarks(results.pose_landmarks, hands)
+    
+    def process_frame(self, frame, timestamp=None):
+        """Detect landmarks once, update every analyzer and draw the combined overlay"""
+        timestamp = time.perf_counter() if timestamp is None else timestamp
+        landmarks = self.detect(frame)
+        for analyzer in self.analyzers:
+            analyzer.update(landmarks, frame, timestamp)
+        
+        self.draw_overlay(frame, landmarks)
+        return frame
+    
+    def draw_overlay(self, frame, landmarks):
+        """Draw the landmarks once and a status line per exercise"""
+        if landmarks.pose:
+            self.mp_drawing.draw_landmarks(frame, landmarks.pose, mp.solutions.pose.POSE_CONNECTIONS)
+        if self.model == 'holistic':
+            for hand in landmarks.hands:
+                self.mp_drawing.draw_landmarks(frame, hand, mp.solutions.hands.HAND_CONNECTIONS)
+        
+        # Status lines on a black background in the top-left corner
+        cv2.rectangle(frame, (10, 20), (460, 30 + 40 * len(self.analyzers)), (0, 0, 0), -1)
+        for i, analyzer in enumerate(self.analyzers):
+            cv2.putText(frame, analyzer.status(), (20, 55 + 40 * i),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+    
+    def finish(self):
+        """End attempts still in progress"""
+        for analyzer in self.analyzers:
+            analyzer.finish()
+    
+    def results(self):
+        """Results of every exercise, keyed by exercise name"""
+        return {analyzer.name: analyzer.results() for analyzer in self.analyzers}
+    
+    def close(self):
+        """Release the landmark model"""
+        self.solution.close()
+    
+    def run(self, camera=0):
+        """Track all exercises live from a webcam until 'q' is pressed"""
+        capture = LatestFrameCapture(camera)
+        
+        # Set fullscreen window
+        cv2.namedWindow('Multi-Exercise Tracker', cv2.WND_PROP_FULLSCREEN)
+        cv2.setWindowProperty('Multi-Exercise Tracker', cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
+        
+        while capture.is_opened():
+            ret, frame, captured_at = capture.read()
+            if not ret:
+                print("Failed to grab frame")
+                break
+            
+            cv2.imshow('Multi-Exercise Tracker', self.process_frame(frame, captured_at))
+            
+            # Exit on 'q' key press
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                break
+        
+        # Clean up
+        self.finish()
+        capture.release()
+        cv2.destroyAllWindows()
+        self.close()
+        return self.results()
+    
+    def process_video(self, video_path, annotated_path=None):
+        """Track all exercises in a recorded video as fast as possible, without a window"""
+        cap = cv2.VideoCapture(str(video_path))
+        if not cap.isOpened():
+            raise ValueError(f"Cannot open video '{video_path}'")
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        
+        writer = None
+        frame_count = 0
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            
+            # Every frame is processed; its time comes from the frame rate, not the clock
+            processed_frame = self.process_frame(frame, frame_count / fps)
+            frame_count += 1
+            
+            # Optionally write the annotated frame
+            if annotated_path:
+                if writer is None:
+                    h, w, _ = processed_frame.shape
+                    writer = cv2.VideoWriter(str(annotated_path), cv2.VideoWriter_fourcc(*'mp4v'), fps, (w, h))
+                writer.write(processed_frame)
+        
+        # Clean up
+        self.finish()
+        cap.release()
+        if writer is not None:
+            writer.release()
+        self.close()
+        
+        return {
+            "video": str(video_path),
+            "frames": frame_count,
+            "fps": fps,
+            "duration_sec": frame_count / fps,
+            "exercises": self.results(),
+        }
+
+def main():
+    """Track several exercises at once from the webcam or from recorded videos"""
+    parser = argparse.ArgumentParser(description='Track handstands and kicks with one shared pose inference.')
+    parser.add_argument('videos', nargs='*', help='Recorded videos to analyze headless (default: live webcam)')
+    parser.add_argument('--exercises', nargs='+', choices=sorted(ANALYZERS), default=sorted(ANALYZERS),
+                        help='Exercises to track (default: all)')
+    parser.add_argument('--model', choices=['holistic', 'pose'], default='holistic',
+                        help='Landmark model: holistic (pose and full hands) or the cheaper pose (default: holistic)')
+    parser.add_argument('--camera', type=int, default=0, help='Webcam index for live tracking (default: 0)')
+    parser.add_argument('--json', help='Write the results of every video to this JSON file')
+    parser.add_argument('--annotate', metavar='DIR', help='Write annotated copies of the videos to this directory')
+    parser.add_argument('--inference-size', type=int, default=640,
+                        help='Longest side of the image passed to MediaPipe (0 = full resolution, default: 640)')
+    parser.add_argument('--no-roi', action='store_true',
+                        help='Always run detection on the whole frame instead of a crop around the last landmarks')
+    args = parser.parse_args()
+    options = dict(exercises=args.exercises, model=args.model,
+                   inference_max_side=args.inference_size, use_roi=not args.no_roi)
+    
+    if not args.videos:
+        print("Starting Multi-Exercise Tracker...")
+        print(f"Tracking: {', '.join(args.exercises)}. Press 'q' to quit.")
+        results = TrackingEngine(**options).run(args.camera)
+        print(json.dumps(results, indent=2))
+        return
+    
+    if args.annotate:
+        os.makedirs(args.annotate, exist_ok=True)
+    
+    results = []
+    for video_path in args.videos:
+        annotated_path = Path(args.annotate) / f"{Path(video_path).stem}_annotated.mp4" if args.annotate else None
+        start = time.perf_counter()
+        result = TrackingEngine(**options).process_video(video_path, annotated_path)
+        elapsed = time.perf_counter() - start
+        results.append(result)
+        
+        print(f"{video_path}: {result['frames']} frames in {elapsed:.1f}s "
+              f"({result['frames'] / max(elapsed, 1e-9):.0f} frames/sec)")
+        for name, exercise in result["exercises"].items():
+            if name == 'handstand':
+                times = ", ".join(f"{attempt['duration_sec']:.2f}s" for attempt in exercise["attempts"]) or "none"
+                print(f"  handstand: {len(exercise['attempts'])} attempts ({times})")
+            elif name == 'kick':
+                heights = ", ".join(f"{kick['height_percent']:.1f}%" for kick in exercise["kicks"]) or "none"
+                print(f"  kick: {len(exercise['kicks'])} kicks ({heights})")
+    
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
+
+if __name__ == "__main__":
+    main()
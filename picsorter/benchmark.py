@@ -0,0 +1,342 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+import cv2
+import numpy as np
+from PIL import Image
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows; psutil is used there when it is installed
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Synthetic corpora: number of images, resolution (width, height) and the file formats cycled through
+CORPORA = {
+    'small': dict(count=100, resolution=(640, 480), formats=('jpg',)),
+    'mixed': dict(count=100, resolution=(1280, 960), formats=('jpg', 'png', 'webp', 'gif')),
+    'hd': dict(count=100, resolution=(1920, 1080), formats=('jpg',)),
+    'camera': dict(count=50, resolution=(6000, 4000), formats=('jpg',)),
+}
+
+PICSORTER_SCRIPT = Path(__file__).resolve().parent / 'picsorter.py'
+
+
+def synthetic_image(rng, width, height):
+    """Smooth random colour field with some grain, so it compresses roughly like a photo."""
+    coarse = (rng.random((height // 64 + 2, width // 64 + 2, 3)) * 255).astype(np.uint8)
+    img = cv2.resize(coarse, (width, height), interpolation=cv2.INTER_CUBIC)
+    grain = rng.integers(-12, 13, size=(height, width, 1), dtype=np.int16)
+    return np.clip(img.astype(np.int16) + grain, 0, 255).astype(np.uint8)
+
+
+def generate_corpus(workdir, name, count, resolution, formats, seed=0):
+    """Write a synthetic corpus once and reuse it on later runs; returns its directory."""
+    width, height = resolution
+    corpus_dir = Path(workdir) / 'corpora' / f"{name}-{count}-{width}x{height}-{'-'.join(formats)}"
+    marker = corpus_dir / '.complete'
+    if marker.exists():
+        return corpus_dir
+    
+    print(f"Generating corpus '{name}': {count} images at {width}x{height} ({', '.join(formats)})")
+    shutil.rmtree(corpus_dir, ignore_errors=True)
+    corpus_dir.mkdir(parents=True)
+    rng = np.random.default_rng(seed)
+    for i in range(count):
+        fmt = formats[i % len(formats)]
+        img = synthetic_image(rng, width, height)
+        path = corpus_dir / f"img{i:05d}.{fmt}"
+        if fmt == 'gif':
+            # OpenCV cannot write GIF
+            Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB)).save(path)
+        else:
+            cv2.imwrite(str(path), img)
+    marker.touch()
+    return corpus_dir
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MiB, or None where it cannot be measured."""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KiB, macOS bytes
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    if psutil is not None:
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss) / (1024 * 1024)
+    return None
+
+
+def latency_summary(seconds):
+    """Count, mean and p50/p95 of per-image latencies, in milliseconds."""
+    if not seconds:
+        return {"count": 0}
+    ms = np.asarray(seconds) * 1000
+    return {
+        "count": len(ms),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+    }
+
+
+def run_end_to_end(corpus_dir, workdir, options):
+    """Sort a fresh copy of a corpus with a JSON-lines log and collect throughput and latencies."""
+    from picsorter import ImageSorter
+    
+    run_dir = Path(tempfile.mkdtemp(prefix='run-', dir=workdir))
+    try:
+        source_dir = run_dir / 'src'
+        shutil.copytree(corpus_dir, source_dir, ignore=shutil.ignore_patterns('.complete'))
+        sorter = ImageSorter(source_dir, run_dir / 'sorted', use_cache=False, quiet=True,
+                             log_format='jsonl', **options)
+        stats = sorter.sort_images()
+        
+        # Per-image latency: the time spent on the image across all pipeline stages
+        latencies = []
+        with open(sorter.log_path) as f:
+            for line in f:
+                record = json.loads(line)
+                if record["event"] == "image":
+                    latencies.append(sum(record["timings"].values()))
+    finally:
+        shutil.rmtree(run_dir, ignore_errors=True)
+    
+    return {
+        "images": stats["total"],
+        "errors": stats["errors"],
+        "images_per_sec": stats["images_per_sec"],
+        "elapsed_sec": stats["elapsed"],
+        "startup_sec": stats["startup_sec"],
+        "model_load_sec": stats["model_load_sec"],
+        "stage_sec": stats["stages"],
+        "latency": latency_summary(latencies),
+    }
+
+
+def run_stages(corpus_dir, options):
+    """Time decode, inference and face detection separately over a corpus."""
+    from picsorter import ImageSorter, scan_image_files
+    
+    sorter = ImageSorter(use_cache=False, quiet=True, **options)
+    sorter.load_model()
+    
+    start = time.perf_counter()
+    paths = list(scan_image_files(corpus_dir))
+    scan_sec = time.perf_counter() - start
+    
+    # Decode (read, decode, resize and hash) one image at a time
+    decoded = []
+    decode_times = []
+    for img_path in paths:
+        start = time.perf_counter()
+        decoded.append(sorter.decode_image(img_path))
+        decode_times.append(time.perf_counter() - start)
+    
+    # One forward pass per batch, shared out over the images of the batch
+    inference_times = []
+    for i in range(0, len(decoded), sorter.batch_size):
+        batch = decoded[i:i + sorter.batch_size]
+        start = time.perf_counter()
+        sorter.backend.predict(np.stack([img.model_input for img in batch]))
+        inference_times.extend([(time.perf_counter() - start) / len(batch)] * len(batch))
+    
+    face_times = []
+    for img in decoded:
+        start = time.perf_counter()
+        sorter.count_faces(img.face_gray)
+        face_times.append(time.perf_counter() - start)
+    
+    stages = {"scan": {"images": len(paths), "total_sec": scan_sec}}
+    for stage, times in (("decode", decode_times), ("inference", inference_times), ("face", face_times)):
+        total = sum(times)
+        stages[stage] = dict(latency_summary(times), total_sec=total,
+                             images_per_sec=len(times) / total if total > 0 else 0.0)
+    return stages
+
+
+def run_scenario(corpus_dir, workdir, options, stages, results):
+    """Benchmark one corpus in this (fresh) process and put the result on the results queue."""
+    try:
+        result = {"end_to_end": run_end_to_end(corpus_dir, workdir, options)}
+        # Measured before the stage benchmark, which keeps every decoded image in memory
+        result["peak_rss_mb"] = peak_rss_mb()
+        if stages:
+            result["stages"] = run_stages(corpus_dir, options)
+        results.put(result)
+    except Exception as e:
+        results.put({"error": f"{type(e).__name__}: {e}"})
+
+
+def wait_for_result(process, results, poll_interval=1.0):
+    """The result of a scenario process, or an error result if the process died without reporting one."""
+    while True:
+        try:
+            return results.get(timeout=poll_interval)
+        except queue.Empty:
+            if process.is_alive():
+                continue
+        # A crash (e.g. a failing TensorFlow import or running out of memory) never reaches the queue;
+        # look once more in case the result was put just before the process exited
+        try:
+            return results.get(timeout=poll_interval)
+        except queue.Empty:
+            return {"error": f"benchmark process exited with code {process.exitcode} without a result"}
+
+
+def measure_startup(workdir, repeats=3):
+    """Wall-clock time of the CLI from launch to exit for a dry run over an empty directory."""
+    empty_dir = Path(workdir) / 'empty'
+    empty_dir.mkdir(parents=True, exist_ok=True)
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, str(PICSORTER_SCRIPT), str(empty_dir), '--dry-run'],
+                       check=True, stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return {"runs": repeats, "median_sec": float(np.median(times)), "min_sec": min(times)}
+
+
+def git_revision():
+    """Current git commit of the repository, if available."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PICSORTER_SCRIPT.parent,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def benchmark(corpora, workdir, options, stages=True, json_path=None, label=None):
+    """Run every selected corpus in its own process and report the results."""
+    os.makedirs(workdir, exist_ok=True)
+    report = {
+        "label": label,
+        "revision": git_revision(),
+        "date": time.strftime('%Y-%m-%d %H:%M:%S'),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "options": options,
+        "startup": measure_startup(workdir),
+        "results": [],
+    }
+    print(f"CLI startup: {report['startup']['median_sec']:.2f}s (median of {report['startup']['runs']})")
+    
+    # A fresh spawned process per corpus keeps peak RSS and model load times independent
+    context = multiprocessing.get_context('spawn')
+    for name in corpora:
+        spec = CORPORA[name]
+        corpus_dir = generate_corpus(workdir, name, **spec)
+        print(f"Benchmarking '{name}'...")
+        results = context.Queue()
+        process = context.Process(target=run_scenario, args=(str(corpus_dir), workdir, options, stages, results))
+        process.start()
+        result = wait_for_result(process, results)
+        process.join()
+        if "error" in result:
+            print(f"'{name}' failed: {result['error']}")
+        
+        result.update(corpus=name, count=spec["count"], resolution=list(spec["resolution"]),
+                      formats=list(spec["formats"]))
+        report["results"].append(result)
+    
+    print_report(report)
+    if json_path:
+        Path(json_path).write_text(json.dumps(report, indent=2))
+        print(f"Results written to {json_path}")
+    return report
+
+
+def print_report(report):
+    """Print a table of the end-to-end results."""
+    print(f"\n{'Corpus':<10}{'Images':>8}{'img/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'Startup s':>11}{'Peak RSS MB':>13}")
+    for result in report["results"]:
+        if "error" in result:
+            print(f"{result['corpus']:<10}  failed: {result['error']}")
+            continue
+        e2e = result["end_to_end"]
+        rss = result["peak_rss_mb"]
+        print(f"{result['corpus']:<10}{e2e['images']:>8}{e2e['images_per_sec']:>10.1f}"
+              f"{e2e['latency'].get('p50_ms', 0):>9.1f}{e2e['latency'].get('p95_ms', 0):>9.1f}"
+              f"{e2e['startup_sec']:>11.2f}{rss if rss is None else round(rss):>13}")
+
+
+def compare_reports(baseline_path, candidate_path):
+    """Print the relative change of the key metrics between two benchmark result files."""
+    baseline = json.loads(Path(baseline_path).read_text())
+    candidate = json.loads(Path(candidate_path).read_text())
+    print(f"Baseline:  {baseline.get('label') or baseline.get('revision')} ({baseline['date']})")
+    print(f"Candidate: {candidate.get('label') or candidate.get('revision')} ({candidate['date']})")
+
+    def change(old, new):
+        if not old or new is None:
+            return "n/a"
+        return f"{(new - old) / old:+.1%}"
+    
+    print(f"\nCLI startup: {baseline['startup']['median_sec']:.2f}s -> {candidate['startup']['median_sec']:.2f}s "
+          f"({change(baseline['startup']['median_sec'], candidate['startup']['median_sec'])})")
+    
+    old_results = {r["corpus"]: r for r in baseline["results"] if "error" not in r}
+    print(f"\n{'Corpus':<10}{'img/s':>22}{'p95 ms':>22}{'Peak RSS MB':>22}")
+    for new in candidate["results"]:
+        old = old_results.get(new["corpus"])
+        if old is None or "error" in new:
+            continue
+        metrics = []
+        for old_value, new_value in (
+                (old["end_to_end"]["images_per_sec"], new["end_to_end"]["images_per_sec"]),
+                (old["end_to_end"]["latency"].get("p95_ms"), new["end_to_end"]["latency"].get("p95_ms")),
+                (old["peak_rss_mb"], new["peak_rss_mb"])):
+            metrics.append(f"{change(old_value, new_value):>22}" if old_value is not None else f"{'n/a':>22}")
+        print(f"{new['corpus']:<10}{''.join(metrics)}")
+
+
+def main():
+    """Benchmark ImageSorter on synthetic corpora or compare two benchmark result files."""
+    parser = argparse.ArgumentParser(description='Benchmark PicSorter throughput, latency, memory and startup.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    run_parser = subparsers.add_parser('run', help='Run the benchmark on synthetic corpora')
+    run_parser.add_argument('--corpus', nargs='+', choices=sorted(CORPORA), default=['small', 'mixed', 'hd'],
+                            help='Corpora to benchmark (default: small mixed hd)')
+    run_parser.add_argument('--workdir', default=os.path.join(tempfile.gettempdir(), 'picsorter-benchmark'),
+                            help='Directory for the generated corpora and scratch copies')
+    run_parser.add_argument('--json', help='Write the machine-readable results to this JSON file')
+    run_parser.add_argument('--label', help='Name for this run in the results (default: git revision)')
+    run_parser.add_argument('--no-stages', action='store_true', help='Only run the end-to-end benchmark')
+    run_parser.add_argument('--batch-size', '-b', type=int, default=32, help='Images per forward pass')
+    run_parser.add_argument('--workers', '-w', type=int, default=None, help='Decode worker threads')
+    run_parser.add_argument('--backend', choices=['keras', 'tflite'], default='keras', help='Classifier backend')
+    run_parser.add_argument('--tflite-model', help='Path to the .tflite model used by the tflite backend')
+    
+    compare_parser = subparsers.add_parser('compare', help='Compare two benchmark result files')
+    compare_parser.add_argument('baseline', help='Results of the reference revision')
+    compare_parser.add_argument('candidate', help='Results of the revision being evaluated')
+    
+    args = parser.parse_args()
+    
+    if args.command == 'run':
+        options = dict(batch_size=args.batch_size, workers=args.workers,
+                       backend=args.backend, tflite_model=args.tflite_model)
+        benchmark(args.corpus, args.workdir, options, stages=not args.no_stages,
+                  json_path=args.json, label=args.label)
+    else:
+        compare_reports(args.baseline, args.candidate)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+import argparse
+import json
+import time
+from pathlib import Path
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras.applications.mobilenet_v2 import MobileNetV2
+
+from picsorter import DecodedImage, ImageSorter, scan_image_files
+
+
+def load_inputs(image_dir, limit, input_size=224):
+    """Decode up to limit images from image_dir into preprocessed model inputs."""
+    paths = []
+    inputs = []
+    for img_path in scan_image_files(image_dir, recursive=True):
+        try:
+            inputs.append(DecodedImage(img_path, input_size=input_size, face_max_side=0).model_input)
+            paths.append(img_path)
+        except Exception as e:
+            print(f"Skipping {img_path.name}: {e}")
+        if len(inputs) >= limit:
+            break
+    return paths, inputs
+
+
+def convert_model(output_path, quantize=False, calibration_dir=None, calibration_count=200):
+    """Convert the Keras MobileNetV2 to TFLite, optionally with full int8 quantization."""
+    print("Loading MobileNetV2 model...")
+    model = MobileNetV2(weights='imagenet')
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    
+    if quantize:
+        if not calibration_dir:
+            raise ValueError("int8 quantization needs --calibration-dir with representative images.")
+        _, samples = load_inputs(calibration_dir, calibration_count)
+        if not samples:
+            raise ValueError(f"No usable images found in {calibration_dir}.")
+        print(f"Calibrating int8 quantization on {len(samples)} images...")
+        
+        def representative_dataset():
+            for sample in samples:
+                yield [sample[np.newaxis].astype(np.float32)]
+        
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.int8
+        converter.inference_output_type = tf.int8
+    
+    Path(output_path).write_bytes(converter.convert())
+    print(f"Wrote {output_path}")
+
+
+def run_backend(label, sorter, inputs, batch_size):
+    """Classify all inputs with one sorter's backend and time it."""
+    # Warm up once so one-time allocation does not count towards the throughput
+    sorter.backend.predict(np.stack(inputs[:batch_size]))
+    
+    start = time.perf_counter()
+    preds = []
+    for i in range(0, len(inputs), batch_size):
+        preds.append(sorter.backend.predict(np.stack(inputs[i:i + batch_size])))
+    elapsed = time.perf_counter() - start
+    
+    top_idx, top_scores = sorter.top_predictions(np.concatenate(preds))
+    best = sorter.match_predictions(top_idx, top_scores)
+    decisions = []
+    for row, col in zip(top_idx, best):
+        if col < 0:
+            decisions.append("none")
+        else:
+            decisions.append("person" if sorter.people_mask[row[col]] else "flag")
+    
+    return {
+        "backend": label,
+        "images_per_sec": len(inputs) / elapsed if elapsed > 0 else 0.0,
+        "ms_per_image": 1000 * elapsed / len(inputs),
+        "top1": top_idx[:, 0].tolist(),
+        "decisions": decisions,
+    }
+
+
+def compare(image_dir, tflite_models, threads, batch_size, limit, json_path=None):
+    """Compare the Keras backend against TFLite models on a local image set."""
+    paths, inputs = load_inputs(image_dir, limit)
+    if not inputs:
+        raise ValueError(f"No usable images found in {image_dir}.")
+    print(f"Comparing backends on {len(inputs)} images")
+    
+    candidates = [("keras", dict(backend='keras'))]
+    for model_path in tflite_models:
+        candidates.append((Path(model_path).name,
+                           dict(backend='tflite', tflite_model=model_path, tflite_threads=threads)))
+    
+    results = []
+    for label, options in candidates:
+        start = time.perf_counter()
+        sorter = ImageSorter(batch_size=batch_size, **options)
+        sorter.load_model()
+        load_time = time.perf_counter() - start
+        result = run_backend(label, sorter, inputs, batch_size)
+        result["load_sec"] = load_time
+        results.append(result)
+    
+    # Agreement with the Keras reference: same top-1 class and same sorting decision
+    reference = results[0]
+    for result in results:
+        n = len(paths)
+        result["top1_agreement"] = sum(a == b for a, b in zip(result["top1"], reference["top1"])) / n
+        result["decision_agreement"] = sum(a == b for a, b in zip(result["decisions"], reference["decisions"])) / n
+    
+    print(f"\n{'Backend':<32}{'Load s':>8}{'img/s':>10}{'ms/img':>9}{'Top-1':>8}{'Decision':>10}")
+    for result in results:
+        print(f"{result['backend']:<32}{result['load_sec']:>8.2f}{result['images_per_sec']:>10.1f}"
+              f"{result['ms_per_image']:>9.2f}{result['top1_agreement']:>8.1%}{result['decision_agreement']:>10.1%}")
+    
+    if json_path:
+        summary = [{k: v for k, v in r.items() if k not in ("top1", "decisions")} for r in results]
+        Path(json_path).write_text(json.dumps({"images": len(paths), "results": summary}, indent=2))
+        print(f"Results written to {json_path}")
+    
+    return results
+
+
+def main():
+    """Convert MobileNetV2 to TFLite or compare classifier backends on local images."""
+    parser = argparse.ArgumentParser(description='Convert and compare PicSorter classifier backends.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    convert_parser = subparsers.add_parser('convert', help='Convert MobileNetV2 to a .tflite model')
+    convert_parser.add_argument('--output', '-o', required=True, help='Path of the .tflite file to write')
+    convert_parser.add_argument('--quantize', action='store_true', help='Apply full int8 quantization')
+    convert_parser.add_argument('--calibration-dir', help='Images used to calibrate int8 quantization')
+    convert_parser.add_argument('--calibration-count', type=int, default=200,
+                                help='Number of calibration images (default: 200)')
+    
+    compare_parser = subparsers.add_parser('compare', help='Compare accuracy and speed of backends')
+    compare_parser.add_argument('images', help='Directory of sample images')
+    compare_parser.add_argument('--tflite', nargs='+', default=[], help='TFLite models to compare against Keras')
+    compare_parser.add_argument('--threads', type=int, default=None, help='TFLite interpreter threads')
+    compare_parser.add_argument('--batch-size', '-b', type=int, default=32, help='Images per forward pass')
+    compare_parser.add_argument('--limit', type=int, default=500, help='Maximum number of images (default: 500)')
+    compare_parser.add_argument('--json', help='Write the comparison summary to this JSON file')
+    
+    args = parser.parse_args()
+    
+    if args.command == 'convert':
+        convert_model(args.output, args.quantize, args.calibration_dir, args.calibration_count)
+    else:
+        compare(args.images, args.tflite, args.threads, args.batch_size, args.limit, args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,588 @@
+import time
+
+# Reference point for the startup-time measurement reported in the summary
+PROCESS_START = time.perf_counter()
+
 import os
 import argparse
+import errno
+import hashlib
+import io
+import json
 import shutil
-import time
+import sqlite3
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import cv2
 import numpy as np
-import tensorflow as tf
-from tensorflow.keras.applications.mobilenet_v2 import MobileNetV2, preprocess_input, decode_predictions
-from tensorflow.keras.preprocessing import image
+from PIL import Image
+
+try:
+    # Optional: lets watch mode react to file events instead of waiting for the next poll
+    from inotify_simple import INotify, flags as inotify_flags
+except ImportError:
+    INotify = None
+
+# TensorFlow is imported only when a model is actually loaded (see KerasBackend/TFLiteBackend),
+# so scans, dry runs and fully cached runs start without paying for it.
+
+# File extensions recognised as images (matched case-insensitively)
+IMAGE_EXTENSIONS = frozenset({'.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp'})
+
+# ImageNet class index used by Keras' decode_predictions
+IMAGENET_CLASS_INDEX_URL = 'https://storage.googleapis.com/download.tensorflow.org/data/imagenet_class_index.json'
+
+# OpenCV's DCT-domain JPEG reductions, largest first (other formats are decoded fully and then resized)
+REDUCED_DECODE_FLAGS = ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4),
+                        (2, cv2.IMREAD_REDUCED_COLOR_2))
+
+# Pipeline stages timed per image and totalled in the run summary
+STAGES = ('scan', 'read', 'decode', 'preprocess', 'hash', 'inference', 'face', 'move')
+
+# Write buffer of the log files; per-image lines are only flushed in large blocks
+LOG_BUFFER_SIZE = 1 << 20
+
+
+def preprocess_mobilenet(x):
+    """Scale RGB pixel values to [-1, 1], exactly like Keras' mobilenet_v2.preprocess_input."""
+    return x.astype(np.float32) / 127.5 - 1.0
+
+
+def perceptual_hash(gray, method='dhash'):
+    """64-bit perceptual hash of a grayscale image; similar images differ in only a few bits.
+    
+    dhash compares neighbouring pixels of a 9x8 thumbnail; phash compares the lowest
+    8x8 DCT frequencies of a 32x32 thumbnail with their median, which is slower but
+    more robust to re-compression and contrast changes.
+    """
+    if method == 'dhash':
+        thumb = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA).astype(np.int16)
+        bits = thumb[:, 1:] > thumb[:, :-1]
+    elif method == 'phash':
+        thumb = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+        low = cv2.dct(thumb)[:8, :8]
+        bits = low > np.median(low.flat[1:])
+    else:
+        raise ValueError(f"Unknown perceptual hash '{method}'.")
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def reduced_decode_flag(width, height, min_short_side, min_long_side):
+    """OpenCV imread flag for the largest reduction that keeps both sides above the given minimums."""
+    for factor, flag in REDUCED_DECODE_FLAGS:
+        if min(width, height) // factor >= min_short_side and max(width, height) // factor >= min_long_side:
+            return flag
+    return cv2.IMREAD_COLOR
+
+
+def hamming_distance(a, b):
+    """Number of differing bits between two hashes."""
+    return bin(a ^ b).count('1')
+
+
+def load_imagenet_labels():
+    """Return the 1000 ImageNet class labels, reading Keras' cached class index without importing TensorFlow."""
+    keras_home = os.environ.get('KERAS_HOME', os.path.join(os.path.expanduser('~'), '.keras'))
+    index_path = os.path.join(keras_home, 'models', 'imagenet_class_index.json')
+    if not os.path.exists(index_path):
+        from tensorflow.keras.utils import get_file
+        index_path = get_file('imagenet_class_index.json', IMAGENET_CLASS_INDEX_URL, cache_subdir='models')
+    
+    with open(index_path) as f:
+        class_index = json.load(f)
+    return [class_index[str(i)][1] for i in range(len(class_index))]
+
+
+def scan_image_files(root, recursive=False, exclude=()):
+    """Yield image files under root one at a time, in a single os.scandir pass per directory.
+    
+    Directories listed in exclude (e.g. the destination folder) are never entered.
+    Only a stack of pending directories is kept, so memory stays flat on huge archives.
+    """
+    excluded = {os.path.realpath(p) for p in exclude if p}
+    pending = [os.fspath(root)]
+    
+    while pending:
+        directory = pending.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_file():
+                            if os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS:
+                                yield Path(entry.path)
+                        elif recursive and entry.is_dir(follow_symlinks=False):
+                            if os.path.realpath(entry.path) not in excluded:
+                                pending.append(entry.path)
+                    except OSError:
+                        continue
+        except OSError as e:
+            print(f"Cannot scan {directory}: {e}")
+
+
+class KerasBackend:
+    """The full Keras MobileNetV2 running float32 inference."""
+    
+    name = 'keras'
+
+    def __init__(self):
+        """Describe the model; the weights are loaded by load() on first use."""
+        self.model = None
+        self.model_id = 'MobileNetV2/imagenet'
+        self.input_size = 224
+
+    def load(self):
+        """Import TensorFlow and load MobileNetV2 with ImageNet weights."""
+        from tensorflow.keras.applications.mobilenet_v2 import MobileNetV2
+        print("Loading MobileNetV2 model...")
+        self.model = MobileNetV2(weights='imagenet')
+
+    def predict(self, batch):
+        """Return ImageNet class probabilities for a float32 batch of preprocessed images."""
+        if self.model is None:
+            self.load()
+        return np.asarray(self.model.predict_on_batch(batch))
+
+
+class TFLiteBackend:
+    """MobileNetV2 converted to TensorFlow Lite (float or int8-quantized) run by the TFLite interpreter."""
+    
+    name = 'tflite'
+
+    def __init__(self, model_path, num_threads=None):
+        """Describe the model; the interpreter is created by load() on first use."""
+        self.model_path = Path(model_path)
+        self.num_threads = num_threads
+        self.interpreter = None
+        self.input_size = 224
+        
+        # Identify the model by content so a re-converted file invalidates the result cache
+        digest = hashlib.blake2b(self.model_path.read_bytes(), digest_size=8).hexdigest()
+        self.model_id = f"tflite:{self.model_path.name}:{digest}"
+
+    def load(self):
+        """Create the interpreter; the small tflite_runtime package is used instead of TensorFlow when installed."""
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+        
+        print(f"Loading TFLite model {self.model_path.name}...")
+        self.interpreter = Interpreter(model_path=str(self.model_path), num_threads=self.num_threads)
+        self.interpreter.allocate_tensors()
+        self.input_details = self.interpreter.get_input_details()[0]
+        self.output_details = self.interpreter.get_output_details()[0]
+        self.input_size = int(self.input_details['shape'][1])
+        self.batch_capacity = int(self.input_details['shape'][0])
+
+    def resize_batch(self, batch_size):
+        """Resize the interpreter's input to batch_size; returns False if the model has a fixed batch."""
+        if batch_size == self.batch_capacity:
+            return True
+        try:
+            self.interpreter.resize_tensor_input(self.input_details['index'],
+                                                 [batch_size, self.input_size, self.input_size, 3])
+            self.interpreter.allocate_tensors()
+        except (RuntimeError, ValueError):
+            return False
+        self.input_details = self.interpreter.get_input_details()[0]
+        self.output_details = self.interpreter.get_output_details()[0]
+        self.batch_capacity = batch_size
+        return True
+
+    def invoke(self, x):
+        """Run one interpreter call, quantizing the input and dequantizing the output if needed."""
+        dtype = self.input_details['dtype']
+        if dtype != np.float32:
+            scale, zero_point = self.input_details['quantization']
+            info = np.iinfo(dtype)
+            x = np.clip(np.round(x / scale + zero_point), info.min, info.max).astype(dtype)
+        self.interpreter.set_tensor(self.input_details['index'], x)
+        self.interpreter.invoke()
+        
+        out = self.interpreter.get_tensor(self.output_details['index'])
+        if self.output_details['dtype'] != np.float32:
+            scale, zero_point = self.output_details['quantization']
+            out = (out.astype(np.float32) - zero_point) * scale
+        return out
+
+    def predict(self, batch):
+        """Return ImageNet class probabilities for a float32 batch of preprocessed images."""
+        if self.interpreter is None:
+            self.load()
+        if self.resize_batch(len(batch)):
+            return self.invoke(batch)
+        # Fixed-batch model: run the images one at a time
+        return np.concatenate([self.invoke(batch[i:i + 1]) for i in range(len(batch))])
+
+
+def create_backend(name='keras', tflite_model=None, tflite_threads=None):
+    """Build the classifier backend selected on the command line."""
+    if name == 'keras':
+        return KerasBackend()
+    if name == 'tflite':
+        if not tflite_model:
+            raise ValueError("The tflite backend needs --tflite-model pointing at a converted .tflite file.")
+        return TFLiteBackend(tflite_model, num_threads=tflite_threads)
+    raise ValueError(f"Unknown backend '{name}'.")
+
+
+class DecodedImage:
+    """A single decode of an image file, shared by the classifier and the face detector."""
+
+    def __init__(self, img_path, input_size=224, face_max_side=800, hash_method=None, reduced=True):
+        """Decode the file once and derive the model input and the grayscale face-detection input.
+        
+        With reduced, large JPEGs are decoded in the DCT domain at 1/2, 1/4 or 1/8 scale,
+        as far as the model input and the face-detection image still have enough pixels;
+        only face_max_side=0 (full-resolution face detection) needs a full decode.
+        With a hash_method, the perceptual hash used for near-duplicate detection is computed too.
+        """
+        start = time.perf_counter()
+        data = np.fromfile(str(img_path), dtype=np.uint8)
+        read_done = time.perf_counter()
+        
+        flag = cv2.IMREAD_COLOR
+        self.width = self.height = None
+        if reduced and face_max_side and data.size:
+            try:
+                # Pillow only parses the header here; the pixels are decoded by OpenCV below
+                with Image.open(io.BytesIO(data)) as img:
+                    self.width, self.height = img.size
+                flag = reduced_decode_flag(self.width, self.height, input_size, face_max_side)
+            except Exception:
+                pass
+        
+        bgr = cv2.imdecode(data, flag) if data.size else None
+        if bgr is None:
+            # OpenCV cannot read every format (e.g. GIF), so fall back to Pillow
+            with Image.open(img_path) as img:
+                bgr = cv2.cvtColor(np.asarray(img.convert('RGB')), cv2.COLOR_RGB2BGR)
+        decode_done = time.perf_counter()
+        
+        # width/height keep the full (stored) size of the image; h/w are the decoded size
+        h, w = bgr.shape[:2]
+        if self.width is None:
+            self.width = w
+            self.height = h
+        
+        # Classifier input: RGB at the model resolution, preprocessed for MobileNetV2
+        small = cv2.resize(bgr, (input_size, input_size), interpolation=cv2.INTER_AREA)
+        rgb = cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+        self.model_input = preprocess_mobilenet(rgb)
+        
+        # Face detection input: grayscale, downscaled so the longer side is at most face_max_side
+        scale = face_max_side / max(h, w) if face_max_side else 1.0
+        if scale < 1.0:
+            bgr = cv2.resize(bgr, (max(1, round(w * scale)), max(1, round(h * scale))),
+                             interpolation=cv2.INTER_AREA)
+        self.face_gray = cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY)
+        preprocess_done = time.perf_counter()
+        
+        # Seconds spent in each stage, reported in the per-image log records
+        self.timings = {"read": read_done - start, "decode": decode_done - read_done,
+                        "preprocess": preprocess_done - decode_done}
+        
+        self.image_hash = None
+        if hash_method:
+            self.image_hash = perceptual_hash(self.face_gray, hash_method)
+            self.timings["hash"] = time.perf_counter() - preprocess_done
+
+
+class HashIndex:
+    """In-memory BK-tree over perceptual hashes, answering nearest-neighbour queries by Hamming distance.
+    
+    Each node is [hash, value, {distance: child}]. The triangle inequality lets a
+    query within max_distance of a node skip every child edge outside
+    [d - max_distance, d + max_distance], so lookups only visit a small part of the tree.
+    """
+
+    def __init__(self):
+        """Start with an empty tree."""
+        self.root = None
+        self.size = 0
+
+    def add(self, image_hash, value):
+        """Index value under image_hash; an identical hash keeps its first value."""
+        node = [image_hash, value, {}]
+        if self.root is None:
+            self.root = node
+            self.size = 1
+            return
+        
+        current = self.root
+        while True:
+            distance = hamming_distance(image_hash, current[0])
+            if distance == 0:
+                return
+            child = current[2].get(distance)
+            if child is None:
+                current[2][distance] = node
+                self.size += 1
+                return
+            current = child
+
+    def find(self, image_hash, max_distance):
+        """Return (distance, value) of the closest indexed hash within max_distance, or None."""
+        best = None
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            distance = hamming_distance(image_hash, node[0])
+            if distance <= max_distance and (best is None or distance < best[0]):
+                best = (distance, node[1])
+                if distance == 0:
+                    break
+            for edge, child in node[2].items():
+                if distance - max_distance <= edge <= distance + max_distance:
+                    stack.append(child)
+        return best
+
+
+class ResultCache:
+    """Persistent SQLite cache of classifier output so unchanged images are not classified twice."""
+
+    def __init__(self, db_path, config_key, max_entries=100000, hash_contents=False, read_only=False):
+        """Open (or create) the cache database and drop entries made with a different configuration.
+        
+        A read-only cache (used by dry runs) never writes; if its configuration differs,
+        every lookup is a miss instead.
+        """
+        self.db_path = Path(db_path)
+        self.max_entries = max(1, int(max_entries))
+        self.hash_contents = hash_contents
+        self.read_only = read_only
+        self.valid = True
+        
+        if read_only:
+            self.conn = sqlite3.connect(f"{self.db_path.resolve().as_uri()}?mode=ro", uri=True)
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'config'").fetchone()
+            self.valid = row is not None and row[0] == config_key
+            return
+        
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS results ("
+                          "file_key TEXT PRIMARY KEY, predictions TEXT NOT NULL, "
+                          "face_count INTEGER, last_used REAL NOT NULL)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+        
+        # Invalidate everything if the model or keyword sets changed since the cache was written
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'config'").fetchone()
+        if row is None or row[0] != config_key:
+            self.conn.execute("DELETE FROM results")
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('config', ?)", (config_key,))
+        self.conn.commit()
+
+    def file_key(self, img_path):
+        """Identify a file by its content hash, or by (path, size, mtime) for a cheap stat-only key."""
+        if self.hash_contents:
+            digest = hashlib.blake2b(digest_size=20)
+            with open(img_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(chunk)
+            return "sha:" + digest.hexdigest()
+        
+        st = os.stat(img_path)
+        return f"stat:{os.path.abspath(img_path)}|{st.st_size}|{st.st_mtime_ns}"
+
+    def get(self, file_key):
+        """Return (top_idx, top_scores, face_count) for a cached file, or None on a miss."""
+        if not self.valid:
+            return None
+        row = self.conn.execute("SELECT predictions, face_count FROM results WHERE file_key = ?",
+                                (file_key,)).fetchone()
+        if row is None:
+            return None
+        
+        if not self.read_only:
+            self.conn.execute("UPDATE results SET last_used = ? WHERE file_key = ?", (time.time(), file_key))
+        top_idx, top_scores = json.loads(row[0])
+        return np.array(top_idx, dtype=np.int64), np.array(top_scores, dtype=np.float32), row[1]
+
+    def put(self, file_key, top_idx, top_scores, face_count):
+        """Store the top-k class indices and scores and the face count (None if not needed)."""
+        payload = json.dumps([[int(i) for i in top_idx], [float(p) for p in top_scores]])
+        self.conn.execute("INSERT OR REPLACE INTO results (file_key, predictions, face_count, last_used) "
+                          "VALUES (?, ?, ?, ?)", (file_key, payload, face_count, time.time()))
+
+    def evict(self):
+        """Drop the least recently used entries beyond max_entries."""
+        count = self.conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self.conn.execute("DELETE FROM results WHERE file_key IN "
+                              "(SELECT file_key FROM results ORDER BY last_used ASC LIMIT ?)", (excess,))
+        return max(0, excess)
+
+    def commit(self):
+        """Flush pending writes to disk."""
+        self.conn.commit()
+
+    def close(self):
+        """Apply the size bound and close the database."""
+        if not self.read_only:
+            self.evict()
+            self.conn.commit()
+        self.conn.close()
+
+
+class MoveJournal:
+    """Append-only JSON-lines journal of sorting decisions and completed moves.
+    
+    Every decision is written (and fsynced) before the file is moved, and every
+    completed move afterwards, so an interrupted run can be resumed: finished files
+    are skipped and decided-but-unmoved files are moved without classifying them again.
+    A completed run keeps only matches that still wait to be moved (see finish), so
+    later runs go through the result cache again.
+    """
+
+    def __init__(self, journal_path, config_key, resume=True):
+        """Load the journal left by an interrupted run, compact it and open it for appending.
+        
+        Decisions made with a different configuration (see ImageSorter.cache_config_key)
+        are dropped; without resume, the whole journal is discarded.
+        """
+        self.journal_path = Path(journal_path)
+        self.config = hashlib.blake2b(config_key.encode(), digest_size=8).hexdigest()
+        self.entries = {}  # source path -> {"sig": [size, mtime_ns], "matched", "keywords", "moved"}
+        
+        lines = 0
+        if self.journal_path.exists():
+            with open(self.journal_path) as f:
+                for line in f:
+                    lines += 1
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # a line torn by a crash mid-write
+                    if record.get("event") == "decision" and record.get("config") == self.config:
+                        self.entries[record["src"]] = {"sig": record["sig"], "matched": record["matched"],
+                                                       "keywords": record.get("keywords", []), "moved": False}
+                    elif record.get("event") == "moved" and record["src"] in self.entries:
+                        self.entries[record["src"]]["moved"] = True
+        
+        # Moved files and files that disappeared need no further record
+        self.entries = {src: e for src, e in self.entries.items() if not e["moved"] and os.path.exists(src)}
+        if not resume:
+            self.entries = {}
+        if lines > len(self.entries):
+            self.compact()
+        
+        self.file = open(self.journal_path, 'a')
+
+    def compact(self):
+        """Atomically rewrite the journal with only the entries that are still relevant."""
+        tmp_path = self.journal_path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            for src, entry in self.entries.items():
+                f.write(json.dumps({"event": "decision", "src": src, "sig": entry["sig"], "config": self.config,
+                                    "matched": entry["matched"], "keywords": entry["keywords"]}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.journal_path)
+
+    @staticmethod
+    def signature(img_path):
+        """(size, mtime_ns) of a file, used to tell whether it changed since it was journaled."""
+        st = os.stat(img_path)
+        return [st.st_size, st.st_mtime_ns]
+
+    def is_finished(self, img_path):
+        """True if an unchanged file was already decided as not matching."""
+        entry = self.entries.get(os.path.abspath(img_path))
+        if entry is None or entry["matched"]:
+            return False
+        try:
+            return entry["sig"] == self.signature(img_path)
+        except OSError:
+            return False
+
+    def pending_moves(self):
+        """(source path, keywords) of unchanged files that were decided as matches but never moved."""
+        pending = []
+        for src, entry in self.entries.items():
+            try:
+                if entry["matched"] and entry["sig"] == self.signature(src):
+                    pending.append((Path(src), entry["keywords"]))
+            except OSError:
+                continue
+        return pending
+
+    def record_decision(self, img_path, matched, keywords):
+        """Append a classification decision."""
+        src = os.path.abspath(img_path)
+        sig = self.signature(img_path)
+        self.entries[src] = {"sig": sig, "matched": matched, "keywords": keywords, "moved": False}
+        self.file.write(json.dumps({"event": "decision", "src": src, "sig": sig, "config": self.config,
+                                    "matched": matched, "keywords": keywords}) + "\n")
+
+    def record_move(self, img_path, destination_path):
+        """Append a completed move."""
+        src = os.path.abspath(img_path)
+        self.entries.pop(src, None)
+        self.file.write(json.dumps({"event": "moved", "src": src, "dst": os.path.abspath(destination_path)}) + "\n")
+
+    def sync(self):
+        """Make everything written so far durable."""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        """Sync and close the journal."""
+        self.sync()
+        self.file.close()
+
+    def finish(self):
+        """Close the journal after a completed run, keeping only matches that were never moved."""
+        self.close()
+        self.entries = {src: e for src, e in self.entries.items() if e["matched"]}
+        self.compact()
+
+    def checkpoint(self):
+        """Compact the journal like finish, then keep it open; bounds its size in long watch sessions."""
+        self.finish()
+        self.file = open(self.journal_path, 'a')
+
 
 class ImageSorter:
-    def __init__(self, source_dir=None, destination_dir=None):
+    def __init__(self, source_dir=None, destination_dir=None, batch_size=32,
+                 use_cache=True, cache_size=100000, cache_hash=False, recursive=False,
+                 workers=None, prefetch=None, face_max_side=800,
+                 backend='keras', tflite_model=None, tflite_threads=None, dry_run=False,
+                 quiet=False, log_format='text', dedupe=True, dedupe_hash='dhash', dedupe_threshold=4,
+                 reduced_decode=True):
         """Initialize the image sorter with source and destination directories."""
         self.source_dir = Path(source_dir) if source_dir else None
         self.destination_dir = Path(destination_dir) if destination_dir else None
         
-        # Load the pre-trained model
-        print("Loading MobileNetV2 model...")
-        self.model = MobileNetV2(weights='imagenet')
+        # Whether sub-directories of the source are scanned as well
+        self.recursive = recursive
+        
+        # Scan-only mode: report what would happen without decoding, classifying or moving
+        self.dry_run = dry_run
+        
+        # Number of images classified per forward pass
+        self.batch_size = max(1, int(batch_size))
+        
+        # Decode/preprocess pipeline: worker threads and how many images may be in flight
+        self.workers = max(1, int(workers or os.cpu_count() or 1))
+        self.prefetch = max(1, int(prefetch or 2 * self.batch_size))
+        
+        # Result cache settings (the cache itself lives next to the log file)
+        self.use_cache = use_cache
+        self.cache_size = cache_size
+        self.cache_hash = cache_hash
+        self.result_cache = None
+        
+        # The classifier backend; its model is loaded by load_model() when the first image needs inference
+        self.backend = create_backend(backend, tflite_model, tflite_threads)
+        self.model_loaded = False
+        self.model_load_time = 0.0
+        self.model_lock = threading.Lock()
         
         # Keywords for people detection
         self.people_keywords = {'person', 'people', 'man', 'woman', 'child', 'boy', 'girl', 
@@ -26,67 +591,480 @@ class ImageSorter:
         # Keywords for flag detection
         self.flag_keywords = {'flag', 'banner', 'ensign', 'pennant'}
         
-        # Face detection using OpenCV
-        self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+        # Classifier and face detection parameters
+        self.confidence_threshold = 0.1
+        self.top_k = 5
+        self.face_scale_factor = 1.3
+        self.face_min_neighbors = 5
+        
+        # Longest side of the grayscale image used for face detection (0 = full resolution)
+        self.face_max_side = max(0, int(face_max_side or 0))
         
-        # Initialize log file
+        # Decode large JPEGs at reduced resolution instead of decoding every pixel first
+        self.reduced_decode = reduced_decode
+        
+        # Near-duplicate reuse: images whose perceptual hash is within dedupe_threshold bits
+        # of an already classified image take over its predictions instead of running inference
+        self.dedupe_hash = dedupe_hash if dedupe else None
+        self.dedupe_threshold = max(0, int(dedupe_threshold))
+        self.near_duplicates = HashIndex() if dedupe else None
+        
+        # Keyword masks over the ImageNet classes, built by load_keyword_masks() on first use
+        self.class_labels = None
+        self.people_mask = None
+        self.flag_mask = None
+        self.match_mask = None
+        
+        # Face detection using OpenCV (loaded together with the model)
+        self.face_cascade = None
+        
+        # Initialize log file: human-readable text or one JSON record per line
+        if log_format not in ('text', 'jsonl'):
+            raise ValueError(f"Unknown log format '{log_format}'.")
+        self.log_format = log_format
         self.log_file = None
+        
+        # Quiet mode only prints errors and the summary, not a line per image
+        self.quiet = quiet
+        
+        # Stage timings and details of images whose outcome is not final yet, keyed by path
+        self.image_records = {}
+        
+        # Move journal and the matched images waiting to be moved in the next batch
+        self.journal = None
+        self.pending_moves = []
+
+    def cache_config_key(self):
+        """Describe everything that influences a cached result; a change invalidates the cache."""
+        return json.dumps({
+            "model": self.backend.model_id,
+            "format": "topk-index",
+            "top_k": self.top_k,
+            "people_keywords": sorted(self.people_keywords),
+            "flag_keywords": sorted(self.flag_keywords),
+            "face": [self.face_scale_factor, self.face_min_neighbors, self.face_max_side],
+            "reduced_decode": self.reduced_decode,
+        }, sort_keys=True)
+
+    def load_model(self):
+        """Load the classifier and the Haar cascade once, when the first image needs inference."""
+        with self.model_lock:
+            if self.model_loaded:
+                return
+            start = time.perf_counter()
+            self.backend.load()
+            self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+            self.model_load_time = time.perf_counter() - start
+            self.model_loaded = True
+            print(f"Model ready in {self.model_load_time:.2f}s")
+
+    def load_keyword_masks(self):
+        """Resolve the keyword sets once into masks over the 1000 ImageNet classes.
+        
+        A label matching both sets counts as a person, as the keyword checks always did.
+        """
+        self.class_labels = load_imagenet_labels()
+        self.people_mask = self.keyword_mask(self.people_keywords)
+        self.flag_mask = self.keyword_mask(self.flag_keywords) & ~self.people_mask
+        self.match_mask = self.people_mask | self.flag_mask
+
+    def keyword_mask(self, keywords):
+        """Boolean mask over the ImageNet classes whose label contains any of the keywords."""
+        return np.array([any(keyword in label for keyword in keywords) for label in self.class_labels])
+
+    def top_predictions(self, preds):
+        """Return the top-k class indices and scores of each prediction row, best first."""
+        k = min(self.top_k, preds.shape[1])
+        top_idx = np.argpartition(-preds, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(preds, top_idx, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        return np.take_along_axis(top_idx, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+
+    def match_predictions(self, top_idx, top_scores):
+        """Vectorized keyword match over a batch of top-k rows.
+        
+        Returns, for each row, the column of the best-scoring class that clears the
+        confidence threshold and belongs to a keyword set, or -1 if there is none.
+        """
+        if self.match_mask is None:
+            self.load_keyword_masks()
+        candidates = (top_scores > self.confidence_threshold) & self.match_mask[top_idx]
+        first = np.argmax(candidates, axis=1)
+        return np.where(candidates[np.arange(len(first)), first], first, -1)
+
+    def decode_image(self, img_path):
+        """Decode an image once into its classifier and face-detection inputs."""
+        return DecodedImage(img_path, input_size=self.backend.input_size, face_max_side=self.face_max_side,
+                            hash_method=self.dedupe_hash, reduced=self.reduced_decode)
 
     def contains_person_or_flag(self, img_path):
         """Check if the image contains a person or a flag."""
-        # Load and preprocess the image for MobileNetV2
+        return self.classify_batch([img_path])[0]
+
+    def classify_batch(self, img_paths, cache_keys=None):
+        """Load and classify several images with a single forward pass.
+        
+        Returns a list of (matched, keywords) tuples in the same order as img_paths.
+        When cache_keys is given, each result is also stored in the result cache.
+        """
+        outcomes = [(False, [])] * len(img_paths)
+        self.load_model()
+        
+        # Decode every image; unreadable files are logged and skipped, near-duplicates reuse earlier results
+        images = []
+        loaded = []
+        for i, img_path in enumerate(img_paths):
+            try:
+                decoded = self.decode_image(img_path)
+                reused = self.reuse_near_duplicate(img_path, decoded, cache_keys[i] if cache_keys else None)
+                if reused is not None:
+                    outcomes[i] = reused
+                    continue
+                images.append(decoded)
+                loaded.append(i)
+            except Exception as e:
+                self.log_error(img_path, e)
+        
+        if loaded:
+            keys = [cache_keys[i] for i in loaded] if cache_keys else None
+            predicted = self.predict_batch([img_paths[i] for i in loaded], images, keys)
+            for i, outcome in zip(loaded, predicted):
+                outcomes[i] = outcome or (False, [])
+        
+        # Outside of a run nothing finishes these records, so do not keep them around
+        for img_path in img_paths:
+            self.image_records.pop(str(img_path), None)
+        
+        return outcomes
+
+    def predict_batch(self, img_paths, images, cache_keys=None):
+        """Run one forward pass over decoded images and evaluate each prediction row.
+        
+        Returns (matched, keywords) per image, or None for an image that could not be classified.
+        """
+        outcomes = [None] * len(img_paths)
+        
+        # Predict the whole batch at once and match it against the keyword masks
         try:
-            # Use MobileNetV2 for classification
-            img = image.load_img(img_path, target_size=(224, 224))
-            x = image.img_to_array(img)
-            x = np.expand_dims(x, axis=0)
-            x = preprocess_input(x)
-            
-            # Predict
-            preds = self.model.predict(x)
-            results = decode_predictions(preds, top=5)[0]
+            start = time.perf_counter()
+            preds = self.backend.predict(np.stack([img.model_input for img in images]))
+            top_idx, top_scores = self.top_predictions(preds)
+            best = self.match_predictions(top_idx, top_scores)
+            elapsed = time.perf_counter() - start
+        except Exception as e:
+            for img_path in img_paths:
+                self.log_error(img_path, e)
+            return outcomes
+        self.emit("batch", size=len(img_paths), inference_sec=elapsed)
+        
+        # Hand each row of predictions back to its file
+        for i, img_path in enumerate(img_paths):
+            # Decode stages come from the worker; the forward pass is shared by the whole batch
+            for stage, seconds in images[i].timings.items():
+                self.add_timing(img_path, stage, seconds)
+            self.add_timing(img_path, "inference", elapsed / len(img_paths))
+            try:
+                matched, keywords, face_count = self.check_predictions(
+                    img_path, top_idx[i], top_scores[i], best[i], decoded=images[i])
+                outcomes[i] = (matched, keywords)
+                if cache_keys and cache_keys[i] and self.result_cache:
+                    self.result_cache.put(cache_keys[i], top_idx[i], top_scores[i], face_count)
+                if self.near_duplicates is not None and images[i].image_hash is not None:
+                    self.near_duplicates.add(images[i].image_hash,
+                                             (top_idx[i], top_scores[i], face_count, str(img_path)))
+            except Exception as e:
+                self.log_error(img_paths[i], e)
+        
+        return outcomes
+
+    def reuse_near_duplicate(self, img_path, decoded, cache_key=None):
+        """Take over the predictions of an already classified near-duplicate of this image.
+        
+        Returns (matched, keywords), or None when no indexed image is within
+        dedupe_threshold bits. The reused result is stored in the result cache too.
+        """
+        if self.near_duplicates is None or decoded.image_hash is None:
+            return None
+        found = self.near_duplicates.find(decoded.image_hash, self.dedupe_threshold)
+        if found is None:
+            return None
+        
+        distance, (top_idx, top_scores, face_count, original) = found
+        self.say(f"Reusing the result of near-duplicate {Path(original).name} for {img_path.name} (distance {distance})")
+        self.image_record(img_path).update(near_duplicate_of=original, hash_distance=distance)
+        for stage, seconds in decoded.timings.items():
+            self.add_timing(img_path, stage, seconds)
+        
+        best = self.match_predictions(top_idx[None, :], top_scores[None, :])[0]
+        matched, keywords, face_count = self.check_predictions(img_path, top_idx, top_scores, best,
+                                                               face_count=face_count, decoded=decoded)
+        if cache_key and self.result_cache:
+            self.result_cache.put(cache_key, top_idx, top_scores, face_count)
+        return matched, keywords
+
+    def preprocess_stream(self, items):
+        """Decode and preprocess images on a thread pool, yielding them in input order.
+        
+        items yields (img_path, cache_key) pairs; the result is a stream of
+        (img_path, cache_key, decoded, error) tuples. At most self.prefetch images are
+        in flight, so the workers stay ahead of inference without unbounded memory.
+        """
+        def collect(entry):
+            img_path, cache_key, future = entry
+            try:
+                return img_path, cache_key, future.result(), None
+            except Exception as e:
+                return img_path, cache_key, None, e
+        
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='picsorter-decode') as pool:
+            in_flight = deque()
+            for img_path, cache_key in items:
+                in_flight.append((img_path, cache_key, pool.submit(self.decode_image, img_path)))
+                if len(in_flight) >= self.prefetch:
+                    yield collect(in_flight.popleft())
             
-            # Variables to track detected keywords and scores for logging
-            detected_keywords = []
+            while in_flight:
+                yield collect(in_flight.popleft())
+
+    def check_predictions(self, img_path, top_idx, top_scores, best, face_count=None, decoded=None):
+        """Act on one image's keyword match, falling back to face detection.
+        
+        top_idx/top_scores are the image's top-k row and best the matching column
+        from match_predictions (-1 for none). Returns (matched, keywords, face_count).
+        face_count is None when the classifier already matched; a known face_count
+        (e.g. from the cache) skips face detection. decoded is the image's
+        DecodedImage, reused for face detection when available.
+        """
+        # Variables to track detected keywords and scores for logging
+        detected_keywords = []
+        
+        # Report the matched class, if any
+        if best >= 0:
+            class_index = top_idx[best]
+            label = self.class_labels[class_index]
+            score = float(top_scores[best])
+            kind = "person" if self.people_mask[class_index] else "flag"
+            detected_keywords.append(f"{kind}:{label}:{score:.4f}")
+            self.say(f"Found {kind} ({label}) in {img_path.name} with confidence {score:.2f}")
+            self.write_log(f"IMAGE: {img_path.name}, KEYWORD: {label}, TYPE: {kind}, CONFIDENCE: {score:.4f}\n")
+            self.image_record(img_path).update(type=kind, label=label, confidence=score)
+            return True, detected_keywords, None
+        
+        # Additional check for faces using OpenCV
+        if face_count is None:
+            if decoded is None:
+                decoded = self.decode_image(img_path)
+            start = time.perf_counter()
+            face_count = self.count_faces(decoded.face_gray)
+            self.add_timing(img_path, "face", time.perf_counter() - start)
+        self.image_record(img_path)["faces"] = face_count
+        
+        if face_count > 0:
+            detected_keywords.append(f"face:opencv_detection:{face_count}")
+            self.say(f"Found {face_count} face(s) in {img_path.name}")
+            self.write_log(f"IMAGE: {img_path.name}, KEYWORD: face_detection, TYPE: person, FACES: {face_count}\n")
+            self.image_record(img_path)["type"] = "person"
+            return True, detected_keywords, face_count
+        
+        return False, [], face_count
+
+    def count_faces(self, gray):
+        """Count frontal faces in a grayscale image with the Haar cascade."""
+        if self.face_cascade is None:
+            self.load_model()
+        faces = self.face_cascade.detectMultiScale(gray, self.face_scale_factor, self.face_min_neighbors)
+        return len(faces)
+
+    def lookup_cache(self, img_path):
+        """Return (cache_key, outcome); outcome is (matched, keywords) on a cache hit, else None."""
+        if not self.result_cache:
+            return None, None
+        try:
+            cache_key = self.result_cache.file_key(img_path)
+        except OSError:
+            return None, None
+        
+        cached = self.result_cache.get(cache_key)
+        if cached is None:
+            return cache_key, None
+        
+        top_idx, top_scores, face_count = cached
+        best = self.match_predictions(top_idx[None, :], top_scores[None, :])[0]
+        matched, keywords, _ = self.check_predictions(img_path, top_idx, top_scores, best, face_count=face_count)
+        return cache_key, (matched, keywords)
+
+    def say(self, message):
+        """Print a per-image progress message, unless running in quiet mode."""
+        if not self.quiet:
+            print(message)
+
+    def write_log(self, text):
+        """Append text to the human-readable log (nothing is written in JSON-lines mode)."""
+        if self.log_file and self.log_format == 'text':
+            self.log_file.write(text)
+
+    def emit(self, event, **fields):
+        """Append one structured record to the JSON-lines log (nothing is written in text mode)."""
+        if self.log_file and self.log_format == 'jsonl':
+            record = {"event": event, "time": round(time.time(), 3)}
+            record.update(fields)
+            self.log_file.write(json.dumps(record) + "\n")
+
+    def image_record(self, img_path):
+        """The details collected for an image until its outcome is final."""
+        return self.image_records.setdefault(str(img_path), {"timings": {}})
+
+    def add_timing(self, img_path, stage, seconds):
+        """Add seconds spent on one pipeline stage to an image's record."""
+        timings = self.image_record(img_path)["timings"]
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+    def finish_image(self, img_path, stats, outcome, **fields):
+        """Add an image's stage timings to the run totals and log its structured record."""
+        record = self.image_records.pop(str(img_path), None) or {"timings": {}}
+        for stage, seconds in record["timings"].items():
+            stats["stages"][stage] += seconds
+        record["timings"] = {stage: round(seconds, 6) for stage, seconds in record["timings"].items()}
+        record.update(fields)
+        self.emit("image", path=str(img_path), outcome=outcome, **record)
+
+    def log_error(self, img_path, error):
+        """Report an image that could not be processed."""
+        print(f"Error processing {img_path}: {error}")
+        self.write_log(f"ERROR: {img_path.name}, EXCEPTION: {str(error)}\n")
+        self.image_record(img_path)["error"] = str(error)
+
+    def handle_outcome(self, img_path, matched, keywords, stats):
+        """Journal the decision for an image; matched images are queued for the next batch of moves."""
+        try:
+            self.journal.record_decision(img_path, matched, keywords)
+            if matched:
+                self.pending_moves.append((img_path, keywords))
+            else:
+                self.write_log(f"SKIPPED: {img_path.name} (No people or flags detected)\n")
+                self.finish_image(img_path, stats, "skipped")
+        except Exception as e:
+            stats["errors"] += 1
+            print(f"Error processing {img_path.name}: {e}")
+            self.write_log(f"ERROR: {img_path.name}, {str(e)}\n")
+            self.finish_image(img_path, stats, "error", error=str(e))
+
+    def handle_error(self, img_path, stats):
+        """Count an image that could not be classified; it is not journaled, so the next run tries it again."""
+        stats["errors"] += 1
+        self.finish_image(img_path, stats, "error")
+
+    def unique_destination(self, name):
+        """Destination path for a file name that never overwrites an existing file."""
+        destination_path = self.destination_dir / name
+        stem, suffix = os.path.splitext(name)
+        counter = 1
+        while destination_path.exists():
+            destination_path = self.destination_dir / f"{stem}_{counter}{suffix}"
+            counter += 1
+        return destination_path
+
+    def move_file(self, img_path, destination_path):
+        """Move a file, using a plain rename when source and destination share a filesystem."""
+        if os.stat(img_path).st_dev == self.destination_device:
+            try:
+                os.rename(img_path, destination_path)
+                return
+            except OSError as e:
+                if e.errno != errno.EXDEV:
+                    raise
+        shutil.move(str(img_path), str(destination_path))
+
+    def flush_moves(self, stats):
+        """Move all queued matched images, journaling each completed move."""
+        if not self.pending_moves:
+            return
+        
+        # Decisions must be durable before any file is moved
+        self.journal.sync()
+        for img_path, keywords in self.pending_moves:
+            try:
+                # Move the image to the destination directory
+                start = time.perf_counter()
+                destination_path = self.unique_destination(img_path.name)
+                self.move_file(img_path, destination_path)
+                self.add_timing(img_path, "move", time.perf_counter() - start)
+                self.journal.record_move(img_path, destination_path)
+                stats["moved"] += 1
+                self.say(f"Moved {img_path.name} to {destination_path}")
+                
+                # Add detailed log entry
+                self.write_log(f"MOVED: {img_path.name} -> {destination_path}\n")
+                self.write_log(f"  Keywords detected: {', '.join(keywords)}\n\n")
+                self.finish_image(img_path, stats, "moved", destination=str(destination_path), keywords=keywords)
+            except Exception as e:
+                stats["errors"] += 1
+                print(f"Error processing {img_path.name}: {e}")
+                self.write_log(f"ERROR: {img_path.name}, {str(e)}\n")
+                self.finish_image(img_path, stats, "error", error=str(e))
+        self.pending_moves = []
+        self.journal.sync()
+
+    def skip_cached(self, img_paths, stats):
+        """Handle finished and cached images right away and yield (img_path, cache_key) for the rest."""
+        img_paths = iter(img_paths)
+        while True:
+            # Time the scan per image: a lazy scan does its directory work inside next()
+            start = time.perf_counter()
+            img_path = next(img_paths, None)
+            if img_path is None:
+                break
+            self.add_timing(img_path, "scan", time.perf_counter() - start)
             
-            # Check predictions for people or flag keywords
-            for _, label, score in results:
-                if score > 0.1:  # Confidence threshold
-                    if any(keyword in label for keyword in self.people_keywords):
-                        detected_keywords.append(f"person:{label}:{score:.4f}")
-                        print(f"Found person ({label}) in {img_path.name} with confidence {score:.2f}")
-                        if self.log_file:
-                            self.log_file.write(f"IMAGE: {img_path.name}, KEYWORD: {label}, TYPE: person, CONFIDENCE: {score:.4f}\n")
-                        return True, detected_keywords
-                    elif any(keyword in label for keyword in self.flag_keywords):
-                        detected_keywords.append(f"flag:{label}:{score:.4f}")
-                        print(f"Found flag ({label}) in {img_path.name} with confidence {score:.2f}")
-                        if self.log_file:
-                            self.log_file.write(f"IMAGE: {img_path.name}, KEYWORD: {label}, TYPE: flag, CONFIDENCE: {score:.4f}\n")
-                        return True, detected_keywords
+            stats["total"] += 1
+            if self.journal.is_finished(img_path):
+                stats["resumed"] += 1
+                self.finish_image(img_path, stats, "resumed")
+                continue
             
-            # Additional check for faces using OpenCV
-            img_cv2 = cv2.imread(str(img_path))
-            if img_cv2 is not None:
-                gray = cv2.cvtColor(img_cv2, cv2.COLOR_BGR2GRAY)
-                faces = self.face_cascade.detectMultiScale(gray, 1.3, 5)
-                
-                if len(faces) > 0:
-                    detected_keywords.append(f"face:opencv_detection:{len(faces)}")
-                    print(f"Found {len(faces)} face(s) in {img_path.name}")
-                    if self.log_file:
-                        self.log_file.write(f"IMAGE: {img_path.name}, KEYWORD: face_detection, TYPE: person, FACES: {len(faces)}\n")
-                    return True, detected_keywords
+            cache_key, outcome = self.lookup_cache(img_path)
+            if outcome is not None:
+                self.say(f"Processing {img_path.name}... (cached)")
+                self.image_record(img_path)["cached"] = True
+                stats["cached"] += 1
+                self.handle_outcome(img_path, outcome[0], outcome[1], stats)
+                if len(self.pending_moves) >= self.batch_size:
+                    self.flush_moves(stats)
+                continue
             
-            return False, []
-        except Exception as e:
-            print(f"Error processing {img_path}: {e}")
-            if self.log_file:
-                self.log_file.write(f"ERROR: {img_path.name}, EXCEPTION: {str(e)}\n")
-            return False, []
+            self.say(f"Processing {img_path.name}...")
+            # The model is only loaded once an image actually needs inference, and before
+            # any worker decodes at the model's input size
+            self.load_model()
+            yield img_path, cache_key
+
+    def classify_and_handle(self, batch, stats):
+        """Run one batch of decoded (img_path, cache_key, decoded) items through the classifier."""
+        img_paths = [item[0] for item in batch]
+        cache_keys = [item[1] for item in batch]
+        outcomes = self.predict_batch(img_paths, [item[2] for item in batch], cache_keys)
+        for img_path, outcome in zip(img_paths, outcomes):
+            if outcome is None:
+                self.handle_error(img_path, stats)
+            else:
+                self.handle_outcome(img_path, outcome[0], outcome[1], stats)
+        if self.result_cache:
+            self.result_cache.commit()
+        self.flush_moves(stats)
 
     def sort_images(self, source_dir=None, destination_dir=None):
         """Sort images from source directory to destination directory."""
+        self.prepare_directories(source_dir, destination_dir)
+        if self.dry_run:
+            return self.preview_images()
+        
+        stats = self.start_run()
+        print(f"Scanning {self.source_dir}{' recursively' if self.recursive else ''}...")
+        self.process_images(scan_image_files(self.source_dir, self.recursive, exclude=[self.destination_dir]), stats)
+        return self.finish_run(stats)
+
+    def prepare_directories(self, source_dir=None, destination_dir=None):
+        """Validate the source directory and work out the destination directory."""
         if source_dir:
             self.source_dir = Path(source_dir)
         if destination_dir:
@@ -99,72 +1077,243 @@ class ImageSorter:
         if not self.destination_dir:
             # Create a subdirectory "people_and_flags" in the source directory
             self.destination_dir = self.source_dir / "people_and_flags"
-            
+
+    def start_run(self):
+        """Create the destination directory, log file and result cache; return fresh statistics."""
         # Create destination directory if it doesn't exist
         os.makedirs(self.destination_dir, exist_ok=True)
         
-        # Create log file
-        log_path = self.destination_dir / "picsorter_log.txt"
-        self.log_file = open(log_path, 'w')
-        self.log_file.write(f"PicSorter Log - {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
-        self.log_file.write("=" * 80 + "\n")
-        self.log_file.write(f"Source directory: {self.source_dir}\n")
-        self.log_file.write(f"Destination directory: {self.destination_dir}\n")
-        self.log_file.write("=" * 80 + "\n\n")
-        self.log_file.write("IMAGE SORTING LOG (FORMAT: IMAGE, KEYWORD, TYPE, CONFIDENCE/DETAILS)\n\n")
+        # Append to the log file so earlier (possibly interrupted) runs are kept
+        log_name = "picsorter_log.jsonl" if self.log_format == 'jsonl' else "picsorter_log.txt"
+        self.log_path = self.destination_dir / log_name
+        self.log_file = open(self.log_path, 'a', buffering=LOG_BUFFER_SIZE)
+        self.write_log(f"PicSorter Log - {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
+        self.write_log("=" * 80 + "\n")
+        self.write_log(f"Source directory: {self.source_dir}\n")
+        self.write_log(f"Destination directory: {self.destination_dir}\n")
+        self.write_log("=" * 80 + "\n\n")
+        self.write_log("IMAGE SORTING LOG (FORMAT: IMAGE, KEYWORD, TYPE, CONFIDENCE/DETAILS)\n\n")
+        self.emit("run_start", source=str(self.source_dir), destination=str(self.destination_dir),
+                  backend=self.backend.model_id, batch_size=self.batch_size, workers=self.workers)
+        
+        # Open the result cache next to the log file
+        if self.use_cache:
+            self.result_cache = ResultCache(self.destination_dir / "picsorter_cache.sqlite",
+                                            self.cache_config_key(),
+                                            max_entries=self.cache_size,
+                                            hash_contents=self.cache_hash)
         
         # Keep track of statistics
-        stats = {"total": 0, "moved": 0, "errors": 0}
+        self.run_start = time.perf_counter()
+        stats = {"total": 0, "moved": 0, "errors": 0, "cached": 0, "resumed": 0, "near_duplicates": 0,
+                 "stages": dict.fromkeys(STAGES, 0.0)}
         
-        # Get list of image files
-        image_extensions = ['.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp']
-        image_files = []
+        # Open the move journal and finish moves an interrupted run had already decided on
+        self.destination_device = os.stat(self.destination_dir).st_dev
+        self.journal = MoveJournal(self.destination_dir / "picsorter_journal.jsonl", self.cache_config_key(),
+                                   resume=self.use_cache)
+        self.pending_moves = self.journal.pending_moves()
+        if self.pending_moves:
+            self.say(f"Resuming {len(self.pending_moves)} move(s) from an interrupted run")
+            # They are images of this run too, so "moved of total" and "resumed" stay consistent
+            stats["total"] += len(self.pending_moves)
+            stats["resumed"] += len(self.pending_moves)
+            self.flush_moves(stats)
         
-        for ext in image_extensions:
-            image_files.extend(list(self.source_dir.glob(f"*{ext}")))
-            image_files.extend(list(self.source_dir.glob(f"*{ext.upper()}")))
-            
-        stats["total"] = len(image_files)
-        print(f"Found {stats['total']} images in {self.source_dir}")
-        self.log_file.write(f"Total images found: {stats['total']}\n\n")
+        return stats
+
+    def process_images(self, img_paths, stats):
+        """Stream images through the pipeline and act on every result.
         
-        # Process each image
-        for img_path in image_files:
-            print(f"Processing {img_path.name}...")
+        img_paths feeds the cache lookups, cache misses are decoded on worker threads,
+        and this thread runs one forward pass per batch.
+        """
+        batch = []
+        for img_path, cache_key, decoded, error in self.preprocess_stream(self.skip_cached(img_paths, stats)):
+            if error is not None:
+                self.log_error(img_path, error)
+                self.handle_error(img_path, stats)
+                continue
             
-            try:
-                matched, keywords = self.contains_person_or_flag(img_path)
-                if matched:
-                    # Move the image to the destination directory
-                    destination_path = self.destination_dir / img_path.name
-                    shutil.move(str(img_path), str(destination_path))
-                    stats["moved"] += 1
-                    print(f"Moved {img_path.name} to {self.destination_dir}")
-                    
-                    # Add detailed log entry
-                    self.log_file.write(f"MOVED: {img_path.name} -> {self.destination_dir}\n")
-                    self.log_file.write(f"  Keywords detected: {', '.join(keywords)}\n\n")
-                else:
-                    self.log_file.write(f"SKIPPED: {img_path.name} (No people or flags detected)\n")
-            except Exception as e:
-                stats["errors"] += 1
-                print(f"Error processing {img_path.name}: {e}")
-                self.log_file.write(f"ERROR: {img_path.name}, {str(e)}\n")
+            reused = self.reuse_near_duplicate(img_path, decoded, cache_key)
+            if reused is not None:
+                stats["near_duplicates"] += 1
+                self.handle_outcome(img_path, reused[0], reused[1], stats)
+                if len(self.pending_moves) >= self.batch_size:
+                    self.flush_moves(stats)
+                continue
+            
+            batch.append((img_path, cache_key, decoded))
+            if len(batch) >= self.batch_size:
+                self.classify_and_handle(batch, stats)
+                batch = []
+            
+        if batch:
+            self.classify_and_handle(batch, stats)
+        self.flush_moves(stats)
+
+    def finish_run(self, stats):
+        """Close the cache, write the summary and close the log file."""
+        # Throughput and startup statistics
+        stats["startup_sec"] = self.run_start - PROCESS_START
+        stats["model_load_sec"] = self.model_load_time
+        stats["elapsed"] = time.perf_counter() - self.run_start
+        stats["images_per_sec"] = stats["total"] / stats["elapsed"] if stats["elapsed"] > 0 else 0.0
+        stats["reuse_rate"] = stats["near_duplicates"] / stats["total"] if stats["total"] else 0.0
+        
+        if self.result_cache:
+            self.result_cache.close()
+            self.result_cache = None
+        self.journal.finish()
+        self.journal = None
         
         # Print summary
         summary = f"\nSorting complete: {stats['moved']} of {stats['total']} images moved to {self.destination_dir}"
         if stats["errors"] > 0:
             summary += f"\nEncountered {stats['errors']} errors during processing"
+        if stats["cached"] > 0:
+            summary += f"\n{stats['cached']} images reused cached results"
+        if stats["resumed"] > 0:
+            summary += f"\n{stats['resumed']} images were already handled by an earlier run"
+        if stats["near_duplicates"] > 0:
+            summary += (f"\n{stats['near_duplicates']} near-duplicate images reused an earlier result "
+                        f"({stats['reuse_rate']:.1%} reuse rate)")
+        summary += (f"\nThroughput: {stats['images_per_sec']:.2f} images/sec ({stats['elapsed']:.1f}s, "
+                    f"batch size {self.batch_size}, {self.workers} decode workers)")
+        summary += f"\nStartup: {stats['startup_sec']:.2f}s before scanning, " + (
+            f"model load {stats['model_load_sec']:.2f}s" if self.model_loaded else "model not needed")
+        
+        # Where the time went; decode stages run on worker threads, so they can add up to more than the elapsed time
+        stage_times = ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in stats["stages"].items())
+        summary += f"\nStage times: {stage_times}"
         
         print(summary)
-        self.log_file.write("\n" + "=" * 80 + "\n")
-        self.log_file.write(f"SUMMARY: {stats['moved']} of {stats['total']} images moved, {stats['errors']} errors\n")
-        self.log_file.write("=" * 80 + "\n")
+        self.write_log("\n" + "=" * 80 + "\n")
+        self.write_log(f"Total images found: {stats['total']}\n")
+        self.write_log(f"SUMMARY: {stats['moved']} of {stats['total']} images moved, {stats['errors']} errors, {stats['cached']} cached, {stats['resumed']} resumed, {stats['near_duplicates']} near-duplicates ({stats['reuse_rate']:.1%} reuse rate)\n")
+        self.write_log(f"THROUGHPUT: {stats['images_per_sec']:.2f} images/sec, {stats['elapsed']:.1f}s, batch size {self.batch_size}\n")
+        self.write_log(f"STARTUP: {stats['startup_sec']:.2f}s before scanning, model load {stats['model_load_sec']:.2f}s\n")
+        self.write_log(f"STAGES: {stage_times}\n")
+        self.write_log("=" * 80 + "\n")
+        self.emit("summary", **stats)
         
         # Close log file
         self.log_file.close()
-        print(f"Log file created at: {log_path}")
+        print(f"Log file created at: {self.log_path}")
+        
+        return stats
+
+    def watch(self, poll_interval=2.0, settle_time=3.0, source_dir=None, destination_dir=None):
+        """Keep the model loaded and sort images as they arrive, until interrupted with Ctrl+C.
+        
+        The source is polled every poll_interval seconds against an index of (size, mtime)
+        per file. A new or modified file is only classified once it has stayed unchanged
+        for settle_time seconds, so files that are still being written are left alone.
+        Where the optional inotify_simple package is available, file events wake the
+        poll loop early instead of waiting out the full interval.
+        """
+        self.prepare_directories(source_dir, destination_dir)
+        stats = self.start_run()
+        self.load_model()
+        
+        notifier = None
+        if INotify is not None:
+            notifier = INotify()
+            notifier.add_watch(str(self.source_dir), inotify_flags.CLOSE_WRITE | inotify_flags.MOVED_TO |
+                               inotify_flags.CREATE | inotify_flags.MODIFY)
+        
+        processed = {}  # path -> (size, mtime_ns) of files already handled
+        pending = {}    # path -> ((size, mtime_ns), time the signature was first seen)
+        print(f"Watching {self.source_dir} for new images (Ctrl+C to stop)...")
+        try:
+            while True:
+                now = time.monotonic()
+                ready = []
+                seen = set()
+                for img_path in scan_image_files(self.source_dir, self.recursive, exclude=[self.destination_dir]):
+                    try:
+                        st = os.stat(img_path)
+                    except OSError:
+                        continue
+                    key = str(img_path)
+                    signature = (st.st_size, st.st_mtime_ns)
+                    seen.add(key)
+                    if processed.get(key) == signature:
+                        continue
+                    
+                    # Wait until the file has stopped changing before classifying it
+                    first_seen = pending.get(key)
+                    if first_seen is None or first_seen[0] != signature:
+                        pending[key] = (signature, now)
+                    elif now - first_seen[1] >= settle_time:
+                        del pending[key]
+                        processed[key] = signature
+                        ready.append(img_path)
+                
+                # Forget files that were moved away or deleted
+                processed = {k: v for k, v in processed.items() if k in seen}
+                pending = {k: v for k, v in pending.items() if k in seen}
+                
+                if ready:
+                    self.process_images(ready, stats)
+                    # A watch session can run for weeks; keep the cache within its size bound as it goes,
+                    # and the journal to the moves still outstanding (processed already covers non-matches)
+                    if self.result_cache:
+                        self.result_cache.evict()
+                        self.result_cache.commit()
+                    self.journal.checkpoint()
+                    self.log_file.flush()
+                    print(f"Sorted {len(ready)} new image(s); {stats['moved']} moved so far")
+                
+                # Sleep until the next poll; pending files need another look once they settle
+                timeout = min(poll_interval, settle_time) if pending else poll_interval
+                if notifier is not None:
+                    notifier.read(timeout=int(timeout * 1000))
+                else:
+                    time.sleep(timeout)
+        except KeyboardInterrupt:
+            print("\nStopping watch mode...")
+        finally:
+            if notifier is not None:
+                notifier.close()
+            self.finish_run(stats)
+        
+        return stats
+
+    def preview_images(self):
+        """Dry run: list what a real run would do, using only the scan and the result cache."""
+        cache_path = self.destination_dir / "picsorter_cache.sqlite"
+        if self.use_cache and cache_path.exists():
+            self.result_cache = ResultCache(cache_path, self.cache_config_key(),
+                                            hash_contents=self.cache_hash, read_only=True)
+        
+        stats = {"total": 0, "cached": 0, "would_move": 0, "to_classify": 0}
+        print(f"Dry run: scanning {self.source_dir}{' recursively' if self.recursive else ''}...")
+        start_time = time.perf_counter()
+        for img_path in scan_image_files(self.source_dir, self.recursive, exclude=[self.destination_dir]):
+            stats["total"] += 1
+            _, outcome = self.lookup_cache(img_path)
+            self.image_records.pop(str(img_path), None)
+            if outcome is None:
+                stats["to_classify"] += 1
+                self.say(f"Needs classification: {img_path}")
+            elif outcome[0]:
+                stats["cached"] += 1
+                stats["would_move"] += 1
+                self.say(f"Would move (cached): {img_path}")
+            else:
+                stats["cached"] += 1
+        
+        stats["startup_sec"] = start_time - PROCESS_START
+        stats["elapsed"] = time.perf_counter() - start_time
+        if self.result_cache:
+            self.result_cache.close()
+            self.result_cache = None
         
+        print(f"\nDry run complete: {stats['total']} images found in {stats['elapsed']:.2f}s")
+        print(f"{stats['cached']} have cached results ({stats['would_move']} would be moved), "
+              f"{stats['to_classify']} need classification")
+        print(f"Startup: {stats['startup_sec']:.2f}s before scanning, no model loaded")
         return stats
 
 
@@ -173,6 +1322,47 @@ def main():
     parser = argparse.ArgumentParser(description='Sort images containing people or flags.')
     parser.add_argument('source', nargs='?', help='Source directory containing images')
     parser.add_argument('--dest', '-d', help='Destination directory for sorted images')
+    parser.add_argument('--recursive', '-r', action='store_true',
+                        help='Also sort images in sub-directories of the source directory')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Only scan: report cached decisions and images needing classification, move nothing')
+    parser.add_argument('--watch', action='store_true',
+                        help='Keep running and sort new images as they arrive in the source directory')
+    parser.add_argument('--poll-interval', type=float, default=2.0,
+                        help='Seconds between scans of the source directory in watch mode (default: 2)')
+    parser.add_argument('--settle-time', type=float, default=3.0,
+                        help='Seconds a file must stay unchanged before it is sorted in watch mode (default: 3)')
+    parser.add_argument('--batch-size', '-b', type=int, default=32,
+                        help='Number of images classified per forward pass (default: 32)')
+    parser.add_argument('--backend', choices=['keras', 'tflite'], default='keras',
+                        help='Classifier backend: full Keras model or a converted TFLite model (default: keras)')
+    parser.add_argument('--tflite-model', help='Path to the .tflite model used by the tflite backend')
+    parser.add_argument('--tflite-threads', type=int, default=None,
+                        help='Threads used by the TFLite interpreter (default: interpreter default)')
+    parser.add_argument('--workers', '-w', type=int, default=None,
+                        help='Threads decoding and preprocessing images (default: number of CPU cores)')
+    parser.add_argument('--prefetch', type=int, default=None,
+                        help='Maximum images decoded ahead of inference (default: twice the batch size)')
+    parser.add_argument('--face-max-side', type=int, default=800,
+                        help='Downscale images to this longest side for face detection (0 = full resolution, default: 800)')
+    parser.add_argument('--full-decode', action='store_true',
+                        help='Decode every pixel of large JPEGs instead of decoding them at reduced resolution')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Classify every image again instead of reusing cached results')
+    parser.add_argument('--cache-size', type=int, default=100000,
+                        help='Maximum number of cached results kept on disk (default: 100000)')
+    parser.add_argument('--cache-hash', action='store_true',
+                        help='Key the cache by file content hash instead of path, size and mtime')
+    parser.add_argument('--no-dedupe', action='store_true',
+                        help='Classify near-duplicate images instead of reusing the result of an earlier one')
+    parser.add_argument('--dedupe-hash', choices=['dhash', 'phash'], default='dhash',
+                        help='Perceptual hash used to find near-duplicates (default: dhash)')
+    parser.add_argument('--dedupe-threshold', type=int, default=4,
+                        help='Maximum differing hash bits (of 64) for two images to count as near-duplicates (default: 4)')
+    parser.add_argument('--quiet', '-q', action='store_true',
+                        help='Only print errors and the summary instead of a line per image')
+    parser.add_argument('--log-format', choices=['text', 'jsonl'], default='text',
+                        help='Write a readable text log or one JSON record per image and batch (default: text)')
     
     args = parser.parse_args()
     
@@ -184,8 +1374,19 @@ def main():
     print(f"Destination directory: {destination_dir or 'Will create people_and_flags subfolder'}")
     
     # Create and run the sorter
-    sorter = ImageSorter(source_dir, destination_dir)
-    sorter.sort_images()
+    sorter = ImageSorter(source_dir, destination_dir, batch_size=args.batch_size,
+                         use_cache=not args.no_cache, cache_size=args.cache_size,
+                         cache_hash=args.cache_hash, recursive=args.recursive,
+                         workers=args.workers, prefetch=args.prefetch,
+                         face_max_side=args.face_max_side, backend=args.backend,
+                         tflite_model=args.tflite_model, tflite_threads=args.tflite_threads,
+                         dry_run=args.dry_run, quiet=args.quiet, log_format=args.log_format,
+                         dedupe=not args.no_dedupe, dedupe_hash=args.dedupe_hash,
+                         dedupe_threshold=args.dedupe_threshold, reduced_decode=not args.full_decode)
+    if args.watch:
+        sorter.watch(poll_interval=args.poll_interval, settle_time=args.settle_time)
+    else:
+        sorter.sort_images()
 
 
 if __name__ == "__main__":